@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Answer Write Layer for TorWAR
+Author: Mohamed Toraif
+
+Wraps Well-Architected UpdateAnswer calls to conserve the account's write quota
+during group review sessions.
+
+Features:
+- Elides writes whose choices, notes and applicability match the last known state
+- Sends every other write synchronously, so a saved answer is stored in AWS
+  before the request returns and is visible to every worker
+- Coalesces bursts per question: saves arriving while a write is in flight
+  wait for it, then only the latest of them is sent and all share its result
+- Notifies a callback after every real write so caches can be invalidated
+
+Author: Mohamed Toraif
+License: MIT
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from logging_config import get_logger
+from wa_cache import TTLCache, invalidate_workload_answers
+
+# How long a known answer state is trusted for elision; other reviewers may
+# change the answer in the meantime, so keep this short
+ANSWER_STATE_TTL = int(os.environ.get('WA_ANSWER_STATE_TTL', '300'))
+
+logger = get_logger("answers")
+
+
+def normalize_answer_state(answer: Dict[str, Any]) -> tuple:
+    """
+    Reduce an answer (GetAnswer payload or UpdateAnswer parameters) to the
+    fields a write can change, in a form that compares equal when unchanged.
+    """
+    is_applicable = answer.get('IsApplicable', True)
+    if is_applicable is None:
+        is_applicable = True
+    return (
+        frozenset(choice for choice in (answer.get('SelectedChoices') or []) if choice),
+        answer.get('Notes') or '',
+        bool(is_applicable),
+        # Reason only matters for questions marked not applicable
+        (answer.get('Reason') or '') if not is_applicable else ''
+    )
+
+
+class _PendingWrite:
+    """Latest answer state waiting behind an in-flight write of the same question."""
+    
+    def __init__(self, wa_client, params: Dict[str, Any]):
+        self.wa_client = wa_client
+        self.params = params
+        # Set when the previous write finished and this one may be sent
+        self.turn = threading.Event()
+        self.done = threading.Event()
+        self.claimed = False
+        self.written = False
+        self.error = None
+
+
+class AnswerWriter:
+    """Elides no-op UpdateAnswer calls and coalesces concurrent writes of a question."""
+    
+    def __init__(self, state_ttl: float = ANSWER_STATE_TTL,
+                 on_write: Optional[Callable[[str], None]] = None):
+        """
+        Initialize the writer.
+        
+        Args:
+            state_ttl: Seconds a recorded answer state is trusted for elision
+            on_write: Callback invoked with the workload ID after each real write
+        """
+        self.on_write = on_write
+        self._known_states = TTLCache(max_size=4096, ttl=state_ttl)
+        self._lock = threading.Lock()
+        # Questions with a write in flight, and the write queued behind each
+        self._in_flight = set()
+        self._pending = {}
+        self.stats = {'writes': 0, 'elided': 0, 'coalesced': 0, 'failed': 0}
+    
+    def record_state(self, workload_id: str, lens_alias: str, answer: Dict[str, Any]):
+        """Record the current answer state as read from GetAnswer."""
+        question_id = answer.get('QuestionId') if answer else None
+        if question_id:
+            self._known_states.set((workload_id, lens_alias, question_id), normalize_answer_state(answer))
+    
+    def clear(self):
+        """Forget every recorded answer state, so no write is elided until states are read again."""
+        self._known_states.clear()
+    
+    def write(self, wa_client, **params) -> bool:
+        """
+        Write an answer unless it matches the last known state.
+        
+        While a write of the same question is in flight, the call waits for it;
+        of the calls arriving meanwhile only the latest state is sent, and each
+        of them returns that write's result.
+        
+        Args:
+            wa_client: AWS Well-Architected client
+            **params: UpdateAnswer parameters (WorkloadId, LensAlias, QuestionId, ...)
+        
+        Returns:
+            True if UpdateAnswer was called, False if the write was elided
+        
+        Raises:
+            The UpdateAnswer error if the write failed
+        """
+        key = self._key(params)
+        
+        with self._lock:
+            if key not in self._in_flight:
+                self._in_flight.add(key)
+                write = _PendingWrite(wa_client, params)
+                write.turn.set()
+            elif key in self._pending:
+                # Replaces the queued state; only the latest one is sent
+                write = self._pending[key]
+                write.wa_client, write.params = wa_client, params
+                self.stats['coalesced'] += 1
+            else:
+                write = self._pending[key] = _PendingWrite(wa_client, params)
+        
+        # Queued writes wait for the in-flight one; then one of their callers sends
+        write.turn.wait()
+        if self._claim(key, write):
+            self._send(key, write)
+        
+        write.done.wait()
+        if write.error is not None:
+            raise write.error
+        return write.written
+    
+    def _claim(self, key, write: _PendingWrite) -> bool:
+        """Claim a write for sending; callers arriving later queue the next one."""
+        with self._lock:
+            if write.claimed:
+                return False
+            write.claimed = True
+            if self._pending.get(key) is write:
+                del self._pending[key]
+            return True
+    
+    def _send(self, key, write: _PendingWrite):
+        try:
+            if self._is_unchanged(key, write.params):
+                self._count('elided')
+                return
+            
+            try:
+                write.wa_client.update_answer(**write.params)
+            except Exception as e:
+                # The stored state is unknown after a failed write
+                self._known_states.invalidate(key)
+                self._count('failed')
+                logger.error(f"UpdateAnswer failed for question {key[2]} of workload {key[0]}: {e}")
+                write.error = e
+                return
+            
+            self._known_states.set(key, normalize_answer_state(write.params))
+            self._count('writes')
+            write.written = True
+            if self.on_write:
+                self.on_write(key[0])
+        finally:
+            write.done.set()
+            # Hand the question to the write queued meanwhile, if any
+            with self._lock:
+                queued = self._pending.get(key)
+                if queued is None:
+                    self._in_flight.discard(key)
+            if queued is not None:
+                queued.turn.set()
+    
+    def _is_unchanged(self, key, params) -> bool:
+        known_state = self._known_states.get(key)
+        return known_state is not None and known_state == normalize_answer_state(params)
+    
+    def _count(self, counter: str):
+        with self._lock:
+            self.stats[counter] += 1
+    
+    @staticmethod
+    def _key(params: Dict[str, Any]) -> tuple:
+        return (params['WorkloadId'], params.get('LensAlias', 'wellarchitected'), params['QuestionId'])
+
+
+# Global writer shared by all requests in this process
+answer_writer = AnswerWriter(on_write=invalidate_workload_answers)
@@ -27,17 +27,29 @@ Enhanced Features:
 
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
 from botocore.exceptions import ClientError
 from aws_helper import get_wellarchitected_client, test_aws_connection
 from aws_auth_routes import register_auth_routes
 from report_manager import ReportManager
+from lens_catalog import LensCatalog
+from answer_writer import answer_writer
+from wa_cache import (
+    answer_cache,
+    question_index_cache,
+    lens_version_cache,
+    pillar_stats_cache,
+    lens_associations
+)
 from trusted_advisor_helper import (
     get_all_trusted_advisor_recommendations,
     get_trusted_advisor_summary,
     get_trusted_advisor_check_categories,
-    refresh_trusted_advisor_check
+    refresh_trusted_advisor_check,
+    get_trusted_advisor_refresh_status,
+    get_flagged_resources_page
 )
 
 # Initialize Flask app
@@ -47,6 +59,12 @@ app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-change-this')
 # Debug control - only print DEBUG messages if explicitly enabled
 DEBUG_ENABLED = os.environ.get('DEBUG_REPORTS', 'false').lower() == 'true'
 
+# Maximum number of concurrent GetAnswer calls issued for a single page
+ANSWER_FETCH_WORKERS = max(1, int(os.environ.get('WA_ANSWER_FETCH_WORKERS', '8')))
+
+# Default report mode: 'full' fetches every answer, 'summary' uses ListAnswers only
+REPORT_MODE = os.environ.get('WA_REPORT_MODE', 'full').lower()
+
 def debug_print(message):
     """Print debug message only if DEBUG_REPORTS environment variable is true."""
     if DEBUG_ENABLED:
@@ -98,9 +116,12 @@ def get_choice_titles(selected_choices, all_choices):
 # Register the filter
 app.jinja_env.filters['get_choice_titles'] = get_choice_titles
 
-# Initialize Report Manager with correct data directory
+# Static lens question content shared by all workloads on the same lens version
+lens_catalog = LensCatalog(os.path.join(os.path.dirname(__file__), 'data', 'lens_catalog'))
+
+# Initialize Report Manager with correct data directory; saved reports reference the lens catalog
 data_dir = os.path.join(os.path.dirname(__file__), 'data', 'reports')
-report_manager = ReportManager(data_dir)
+report_manager = ReportManager(data_dir, lens_catalog=lens_catalog)
 
 # Register AWS authentication routes
 register_auth_routes(app)
@@ -184,6 +205,19 @@ def index():
             else:
                 context['workload_count'] = 0
             
+            # Review progress for the selected workload (one cached GetLensReview call)
+            if wa_client and session.get('workload_id'):
+                pillar_stats = get_pillar_statistics(wa_client, session['workload_id'])
+                answered = sum(stats['answered_questions'] for stats in pillar_stats.values())
+                total = sum(stats['total_questions'] for stats in pillar_stats.values())
+                context['review_progress'] = {
+                    'answered_questions': answered,
+                    'total_questions': total,
+                    'completion_percentage': round((answered / total * 100) if total > 0 else 0, 1),
+                    'high_risks': sum(stats['risk_counts'].get('HIGH', 0) for stats in pillar_stats.values()),
+                    'medium_risks': sum(stats['risk_counts'].get('MEDIUM', 0) for stats in pillar_stats.values())
+                }
+            
             # Get Trusted Advisor summary
             ta_summary = get_trusted_advisor_summary()
             context['trusted_advisor'] = ta_summary
@@ -289,6 +323,7 @@ def select_workload(workload_id):
         
         session['workload_id'] = workload_id
         session['workload_name'] = workload.get('WorkloadName', 'Unknown')
+        lens_associations.record(workload_id, workload.get('Lenses', []))
         
         flash(f'Selected workload: {workload.get("WorkloadName")}', 'success')
         return redirect(url_for('index'))
@@ -327,6 +362,7 @@ def create_workload():
             )
             
             workload_id = response['WorkloadId']
+            lens_associations.record(workload_id, ['wellarchitected'])
             flash(f'Workload "{name}" created successfully!', 'success')
             return redirect(url_for('select_workload', workload_id=workload_id))
             
@@ -339,10 +375,34 @@ def create_workload():
 # PILLAR SELECTION AND REVIEW
 # ============================================================================
 
+def ensure_lens_associated(wa_client, workload_id, lens_alias='wellarchitected'):
+    """
+    Associate a lens with a workload unless it is already known to be associated.
+    
+    Associations seen on workload selection or creation are recorded, so the
+    AssociateLenses write call is only made for workloads not seen before.
+    """
+    if lens_associations.is_associated(workload_id, lens_alias):
+        return
+    
+    try:
+        wa_client.associate_lenses(
+            WorkloadId=workload_id,
+            LensAliases=[lens_alias]
+        )
+    except ClientError as e:
+        if 'ConflictException' not in str(e):
+            raise e
+    
+    lens_associations.record(workload_id, [lens_alias])
+
 def get_all_pillar_answers(wa_client, workload_id, pillar_id):
     """
     Get all answers for a pillar with proper pagination handling.
     
+    Results are served from the in-process answer cache when available; the
+    cache is invalidated whenever an answer for the workload is updated.
+    
     Args:
         wa_client: AWS Well-Architected client
         workload_id: The workload ID
@@ -351,6 +411,10 @@ def get_all_pillar_answers(wa_client, workload_id, pillar_id):
     Returns:
         List of all answer summaries for the pillar
     """
+    cached_answers = answer_cache.get(workload_id, 'wellarchitected', pillar_id)
+    if cached_answers is not None:
+        return cached_answers
+    
     all_answers = []
     next_token = None
     
@@ -372,8 +436,159 @@ def get_all_pillar_answers(wa_client, workload_id, pillar_id):
         if not next_token:
             break
     
+    answer_cache.set(workload_id, 'wellarchitected', pillar_id, all_answers)
     return all_answers
 
+def get_question_index(wa_client, workload_id, pillar_id):
+    """
+    Get the ordered question index for a pillar, building it once from ListAnswers.
+    
+    The index provides O(1) question number, previous and next lookups and is
+    reused across page views since question order only depends on the lens.
+    """
+    index = question_index_cache.get(workload_id, 'wellarchitected', pillar_id)
+    if index is None:
+        answers = get_all_pillar_answers(wa_client, workload_id, pillar_id)
+        index = question_index_cache.build(workload_id, 'wellarchitected', pillar_id, answers)
+    return index
+
+def get_lens_version(wa_client, workload_id, lens_alias='wellarchitected'):
+    """
+    Get the lens version a workload is reviewed against.
+    
+    The version keys the lens catalog and is cached per workload. Returns None
+    if it cannot be determined, in which case callers fall back to GetAnswer.
+    """
+    lens_version = lens_version_cache.get((workload_id, lens_alias))
+    if lens_version is not None:
+        return lens_version or None
+    
+    try:
+        response = wa_client.get_lens_review(WorkloadId=workload_id, LensAlias=lens_alias)
+        lens_version = response.get('LensReview', {}).get('LensVersion', '')
+    except Exception as e:
+        print(f"Error getting lens version for {workload_id}: {e}")
+        return None
+    
+    lens_version_cache.set((workload_id, lens_alias), lens_version)
+    return lens_version or None
+
+def fetch_answer_details(wa_client, workload_id, answers, max_workers=None):
+    """
+    Fetch detailed answers for a list of answer summaries concurrently.
+    
+    Args:
+        wa_client: AWS Well-Architected client
+        workload_id: The workload ID
+        answers: Answer summaries as returned by get_all_pillar_answers
+        max_workers: Optional cap on concurrent calls (defaults to ANSWER_FETCH_WORKERS)
+        
+    Returns:
+        List of (summary, detailed_answer, error) tuples in the same order as answers.
+        detailed_answer is None and error holds the exception when a call fails.
+    """
+    def fetch(answer):
+        try:
+            response = wa_client.get_answer(
+                WorkloadId=workload_id,
+                LensAlias='wellarchitected',
+                QuestionId=answer['QuestionId']
+            )
+            return answer, response.get('Answer', {}), None
+        except Exception as e:
+            return answer, None, e
+    
+    if not answers:
+        return []
+    
+    workers = min(max_workers or ANSWER_FETCH_WORKERS, len(answers))
+    if workers <= 1:
+        return [fetch(answer) for answer in answers]
+    
+    # boto3 clients are thread-safe; map() preserves the input order
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fetch, answers))
+
+# Risk levels counted in pillar statistics; questions with a rated risk count as answered
+PILLAR_RISK_LEVELS = ('HIGH', 'MEDIUM', 'LOW', 'NONE', 'NOT_APPLICABLE', 'UNANSWERED')
+RATED_RISK_LEVELS = ('HIGH', 'MEDIUM', 'LOW', 'NONE')
+
+def calculate_pillar_statistics(answers):
+    """Calculate answered/risk statistics for one pillar from its answer summaries."""
+    risk_counts = dict.fromkeys(PILLAR_RISK_LEVELS, 0)
+    for answer in answers:
+        risk = answer.get('Risk') or 'UNANSWERED'
+        risk_counts[risk] = risk_counts.get(risk, 0) + 1
+    return pillar_statistics_from_risk_counts(risk_counts)
+
+def pillar_statistics_from_risk_counts(risk_counts):
+    """
+    Build one pillar's statistics from its per-risk question counts.
+    
+    GetLensReview only reports counts, so both statistics sources use this
+    definition: a question is answered once it has a rated risk, which leaves
+    out unanswered and not applicable questions.
+    """
+    risk_counts = dict(dict.fromkeys(PILLAR_RISK_LEVELS, 0), **risk_counts)
+    total_questions = sum(risk_counts.values())
+    answered_questions = sum(risk_counts.get(risk, 0) for risk in RATED_RISK_LEVELS)
+    
+    return {
+        'total_questions': total_questions,
+        'answered_questions': answered_questions,
+        'unanswered_questions': total_questions - answered_questions,
+        'risk_counts': risk_counts,
+        'completion_percentage': round((answered_questions / total_questions * 100) if total_questions > 0 else 0, 1)
+    }
+
+def get_pillar_statistics(wa_client, workload_id):
+    """
+    Get per-pillar question and risk statistics for a workload.
+    
+    A single GetLensReview call returns RiskCounts for every pillar; pillars it
+    does not cover (or every pillar, if the call fails) fall back to ListAnswers.
+    Results are cached per workload and dropped whenever an answer is updated.
+    
+    Returns:
+        Dictionary of pillar_id -> statistics for every pillar in PILLARS
+    """
+    pillar_stats = pillar_stats_cache.get(workload_id)
+    if pillar_stats is not None:
+        return pillar_stats
+    
+    pillar_stats = {}
+    try:
+        response = wa_client.get_lens_review(WorkloadId=workload_id, LensAlias='wellarchitected')
+        lens_review = response.get('LensReview', {})
+        lens_version_cache.set((workload_id, 'wellarchitected'), lens_review.get('LensVersion', ''))
+        
+        for pillar_summary in lens_review.get('PillarReviewSummaries', []):
+            pillar_id = pillar_summary.get('PillarId')
+            if pillar_id not in PILLARS:
+                continue
+            
+            pillar_stats[pillar_id] = pillar_statistics_from_risk_counts(pillar_summary.get('RiskCounts', {}))
+    except Exception as e:
+        print(f"Error getting lens review for {workload_id}, falling back to ListAnswers: {e}")
+    
+    complete = True
+    for pillar_id in PILLARS.keys():
+        if pillar_id in pillar_stats:
+            continue
+        try:
+            pillar_stats[pillar_id] = calculate_pillar_statistics(
+                get_all_pillar_answers(wa_client, workload_id, pillar_id)
+            )
+        except Exception as e:
+            print(f"Error getting stats for pillar {pillar_id}: {e}")
+            pillar_stats[pillar_id] = calculate_pillar_statistics([])
+            complete = False
+    
+    # Leave partial results uncached so the next request retries failed pillars
+    if complete:
+        pillar_stats_cache.set(workload_id, pillar_stats)
+    return pillar_stats
+
 @app.route('/select_pillars')
 def select_pillars():
     """Select pillars for review."""
@@ -391,38 +606,7 @@ def select_pillars():
     workload_id = session['workload_id']
     
     if wa_client:
-        for pillar_id in PILLARS.keys():
-            try:
-                # Use pagination helper to get all answers
-                answers = get_all_pillar_answers(wa_client, workload_id, pillar_id)
-                
-                total_questions = len(answers)
-                # Use standardized answered questions counting
-                answered_questions = sum(1 for answer in answers if is_question_answered(answer))
-                
-                # Count risk levels
-                risk_counts = {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0, 'NONE': 0, 'UNANSWERED': 0}
-                for answer in answers:
-                    risk = answer.get('Risk', 'UNANSWERED')
-                    risk_counts[risk] = risk_counts.get(risk, 0) + 1
-                
-                pillar_stats[pillar_id] = {
-                    'total_questions': total_questions,
-                    'answered_questions': answered_questions,
-                    'unanswered_questions': total_questions - answered_questions,
-                    'risk_counts': risk_counts,
-                    'completion_percentage': round((answered_questions / total_questions * 100) if total_questions > 0 else 0, 1)
-                }
-                
-            except Exception as e:
-                print(f"Error getting stats for pillar {pillar_id}: {e}")
-                pillar_stats[pillar_id] = {
-                    'total_questions': 0,
-                    'answered_questions': 0,
-                    'unanswered_questions': 0,
-                    'risk_counts': {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0, 'NONE': 0, 'UNANSWERED': 0},
-                    'completion_percentage': 0
-                }
+        pillar_stats = get_pillar_statistics(wa_client, workload_id)
     
     return render_template('select_pillars.html', 
                          pillar_stats=pillar_stats, 
@@ -497,35 +681,45 @@ def review_pillar(pillar_id):
         wa_client = get_wellarchitected_client()
         workload_id = session['workload_id']
         
-        # Associate lens with workload
-        try:
-            wa_client.associate_lenses(
-                WorkloadId=workload_id,
-                LensAliases=['wellarchitected']
-            )
-        except ClientError as e:
-            if 'ConflictException' not in str(e):
-                raise e
+        # Associate lens with workload (at most once per workload per process)
+        ensure_lens_associated(wa_client, workload_id)
         
-        # Get questions for this pillar
+        # Get questions for this pillar and seed the navigation index for answer pages
         answers = get_all_pillar_answers(wa_client, workload_id, pillar_id)
+        question_index_cache.build(workload_id, 'wellarchitected', pillar_id, answers)
+        
+        # Static question content comes from the lens catalog; only questions not
+        # catalogued yet for this lens version need a GetAnswer call
+        lens_version = get_lens_version(wa_client, workload_id)
+        missing_answers = [
+            answer for answer in answers
+            if not lens_catalog.get_question('wellarchitected', lens_version, answer['QuestionId'])
+        ]
+        
+        fetched_questions = {}
+        for answer, question_data, error in fetch_answer_details(wa_client, workload_id, missing_answers):
+            if error is not None:
+                print(f"Error getting question details: {error}")
+                continue
+            fetched_questions[answer['QuestionId']] = question_data
+        lens_catalog.add_answers('wellarchitected', lens_version, fetched_questions.values())
+        missing_question_ids = {answer['QuestionId'] for answer in missing_answers}
         
         # Get detailed question information
         detailed_questions = []
         for index, answer in enumerate(answers, 1):  # Start numbering from 1
-            try:
-                question_response = wa_client.get_answer(
-                    WorkloadId=workload_id,
-                    LensAlias='wellarchitected',
-                    QuestionId=answer['QuestionId']
-                )
-                question_data = question_response.get('Answer', {})
-                # Add question number to the data
-                question_data['QuestionNumber'] = index
-                detailed_questions.append(question_data)
-            except Exception as e:
-                print(f"Error getting question details: {e}")
+            question_id = answer['QuestionId']
+            if question_id in fetched_questions:
+                question_data = fetched_questions[question_id]
+            elif question_id in missing_question_ids:
+                # Detail fetch failed and nothing is catalogued for it
                 continue
+            else:
+                # Join catalogued content with the answer state from ListAnswers
+                question_data = lens_catalog.join('wellarchitected', lens_version, answer)
+            # Add question number to the data
+            question_data['QuestionNumber'] = index
+            detailed_questions.append(question_data)
         
         # Calculate progress - handle both sequential and direct access
         selected_pillars = session.get('selected_pillars', [])
@@ -588,15 +782,12 @@ def answer_question(question_id):
         # Get pillar_id from query parameters
         pillar_id = request.args.get('pillar_id', '')
         
-        # Get all questions for this pillar to determine question number
+        # Use the pillar's question index to determine question number
         question_number = 1  # Default
         if pillar_id:
             try:
-                all_answers = get_all_pillar_answers(wa_client, workload_id, pillar_id)
-                for index, answer in enumerate(all_answers, 1):
-                    if answer['QuestionId'] == question_id:
-                        question_number = index
-                        break
+                question_index = get_question_index(wa_client, workload_id, pillar_id)
+                question_number = question_index.number(question_id) or question_number
             except Exception as e:
                 print(f"Error getting question number: {e}")
         
@@ -608,6 +799,8 @@ def answer_question(question_id):
         )
         
         raw_answer = response.get('Answer', {})
+        lens_catalog.add_answers('wellarchitected', get_lens_version(wa_client, workload_id), [raw_answer])
+        answer_writer.record_state(workload_id, 'wellarchitected', raw_answer)
         
         # Restructure the data to match template expectations
         answer = {
@@ -644,15 +837,7 @@ def answer_question(question_id):
 def get_previous_question_id(wa_client, workload_id, pillar_id, current_question_id):
     """Get the ID of the previous question in the pillar."""
     try:
-        all_answers = get_all_pillar_answers(wa_client, workload_id, pillar_id)
-        question_ids = [answer['QuestionId'] for answer in all_answers]
-        
-        if current_question_id in question_ids:
-            current_index = question_ids.index(current_question_id)
-            if current_index > 0:
-                return question_ids[current_index - 1]
-        
-        return None
+        return get_question_index(wa_client, workload_id, pillar_id).previous(current_question_id)
     except Exception as e:
         print(f"Error getting previous question: {e}")
         return None
@@ -660,15 +845,7 @@ def get_previous_question_id(wa_client, workload_id, pillar_id, current_question
 def get_next_question_id(wa_client, workload_id, pillar_id, current_question_id):
     """Get the ID of the next question in the pillar."""
     try:
-        all_answers = get_all_pillar_answers(wa_client, workload_id, pillar_id)
-        question_ids = [answer['QuestionId'] for answer in all_answers]
-        
-        if current_question_id in question_ids:
-            current_index = question_ids.index(current_question_id)
-            if current_index < len(question_ids) - 1:
-                return question_ids[current_index + 1]
-        
-        return None
+        return get_question_index(wa_client, workload_id, pillar_id).next(current_question_id)
     except Exception as e:
         print(f"Error getting next question: {e}")
         return None
@@ -699,8 +876,8 @@ def handle_answer_submission(question_id):
         if not_applicable and reason:
             update_data['Reason'] = reason
         
-        # Update the answer
-        wa_client.update_answer(**update_data)
+        # Update the answer (skipped when nothing changed since it was loaded)
+        answer_writer.write(wa_client, **update_data)
         
         flash('Answer saved successfully!', 'success')
         
@@ -746,8 +923,9 @@ def save_answer():
         wa_client = get_wellarchitected_client()
         workload_id = session['workload_id']
         
-        # Update the answer
-        wa_client.update_answer(
+        # Update the answer (skipped when nothing changed since it was last read or written)
+        written = answer_writer.write(
+            wa_client,
             WorkloadId=workload_id,
             LensAlias='wellarchitected',
             QuestionId=question_id,
@@ -756,15 +934,170 @@ def save_answer():
             IsApplicable=is_applicable
         )
         
-        return jsonify({'success': True, 'message': 'Answer saved successfully'})
+        return jsonify({'success': True, 'message': 'Answer saved successfully', 'status': 'saved' if written else 'unchanged'})
         
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/api/answer/<question_id>')
+def api_answer_detail(question_id):
+    """API endpoint returning full answer detail for lazily expanded report questions."""
+    if 'aws_region' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    if 'workload_id' not in session:
+        return jsonify({'error': 'No workload selected'}), 400
+    
+    try:
+        wa_client = get_wellarchitected_client()
+        workload_id = session['workload_id']
+        
+        response = wa_client.get_answer(
+            WorkloadId=workload_id,
+            LensAlias='wellarchitected',
+            QuestionId=question_id
+        )
+        raw_answer = response.get('Answer', {})
+        lens_catalog.add_answers('wellarchitected', get_lens_version(wa_client, workload_id), [raw_answer])
+        answer_writer.record_state(workload_id, 'wellarchitected', raw_answer)
+        
+        return jsonify({
+            'QuestionId': raw_answer.get('QuestionId', question_id),
+            'QuestionTitle': raw_answer.get('QuestionTitle', ''),
+            'QuestionDescription': raw_answer.get('QuestionDescription', ''),
+            'Notes': raw_answer.get('Notes', ''),
+            'Reason': raw_answer.get('Reason', ''),
+            'IsApplicable': raw_answer.get('IsApplicable', True),
+            'Risk': raw_answer.get('Risk', ''),
+            'SelectedChoiceTitles': get_choice_titles(raw_answer.get('SelectedChoices', []),
+                                                      raw_answer.get('Choices', [])),
+            'HelpfulResourceUrl': raw_answer.get('HelpfulResourceUrl', ''),
+            'ImprovementPlanUrl': raw_answer.get('ImprovementPlanUrl', '')
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # ============================================================================
 # ENHANCED REPORT MANAGEMENT
 # ============================================================================
 
+def build_summary_report(wa_client, workload_id, workload, pillar_ids):
+    """
+    Build report data from paginated ListAnswers summaries only.
+    
+    Summaries already carry titles, choices, selected choices, risk and
+    applicability, so the overview, risk counts and per-question listings need
+    no GetAnswer calls. Notes and descriptions are loaded on demand through
+    /api/answer/<question_id> (descriptions are joined from the lens catalog
+    when already known).
+    
+    Returns:
+        Dictionary of template variables matching generate_report's full mode
+    """
+    report_data = {
+        'workload': workload,
+        'pillars': {},
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'summary': {
+            'total_questions': 0,
+            'answered_questions': 0,
+            'high_risks': 0,
+            'medium_risks': 0,
+            'low_risks': 0,
+            'no_risks': 0
+        }
+    }
+    overall_stats = {
+        'total_questions': 0,
+        'answered_questions': 0,
+        'not_applicable_questions': 0,
+        'unanswered_questions': 0,
+        'completion_percentage': 0
+    }
+    risk_counts = {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0, 'NONE': 0}
+    risk_summary_keys = {'HIGH': 'high_risks', 'MEDIUM': 'medium_risks', 'LOW': 'low_risks', 'NONE': 'no_risks'}
+    pillar_reviews = {}
+    lens_version = get_lens_version(wa_client, workload_id)
+    
+    for pillar_id in pillar_ids:
+        if pillar_id not in PILLARS:
+            debug_print(f"Unknown pillar ID {pillar_id}, skipping")
+            continue
+        
+        pillar_name = PILLARS[pillar_id]
+        try:
+            answers = get_all_pillar_answers(wa_client, workload_id, pillar_id)
+        except Exception as e:
+            print(f"Error processing pillar {pillar_id}: {e}")
+            continue
+        
+        questions = []
+        pillar_stats = {
+            'total_questions': len(answers),
+            'answered_questions': 0,
+            'not_applicable_questions': 0,
+            'completion_percentage': 0
+        }
+        pillar_risk_counts = {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0, 'NONE': 0}
+        
+        for answer in answers:
+            question = lens_catalog.join('wellarchitected', lens_version, answer)
+            question.setdefault('Choices', [])
+            questions.append(question)
+            
+            if is_question_answered(question):
+                pillar_stats['answered_questions'] += 1
+            if not question.get('IsApplicable', True):
+                pillar_stats['not_applicable_questions'] += 1
+            
+            risk = question.get('Risk', 'UNANSWERED')
+            if risk in pillar_risk_counts:
+                pillar_risk_counts[risk] += 1
+                risk_counts[risk] += 1
+                report_data['summary'][risk_summary_keys[risk]] += 1
+        
+        if pillar_stats['total_questions'] > 0:
+            pillar_stats['completion_percentage'] = round(
+                (pillar_stats['answered_questions'] / pillar_stats['total_questions']) * 100, 1
+            )
+        
+        report_data['summary']['total_questions'] += pillar_stats['total_questions']
+        report_data['summary']['answered_questions'] += pillar_stats['answered_questions']
+        overall_stats['total_questions'] += pillar_stats['total_questions']
+        overall_stats['answered_questions'] += pillar_stats['answered_questions']
+        overall_stats['not_applicable_questions'] += pillar_stats['not_applicable_questions']
+        
+        report_data['pillars'][pillar_id] = {
+            'name': pillar_name,
+            'question_count': len(answers),
+            'questions': questions,
+            'stats': pillar_stats,
+            'risk_counts': pillar_risk_counts
+        }
+        pillar_reviews[pillar_id] = {
+            'PillarName': pillar_name,
+            'RiskCounts': pillar_risk_counts,
+            'Statistics': pillar_stats,
+            'stats': pillar_stats,
+            'risk_counts': pillar_risk_counts
+        }
+    
+    overall_stats['unanswered_questions'] = overall_stats['total_questions'] - overall_stats['answered_questions']
+    if overall_stats['total_questions'] > 0:
+        overall_stats['completion_percentage'] = round(
+            (overall_stats['answered_questions'] / overall_stats['total_questions']) * 100, 1
+        )
+    
+    return {
+        'report_data': report_data,
+        'workload': workload,
+        'pillars': PILLARS,
+        'overall_stats': overall_stats,
+        'risk_counts': risk_counts,
+        'pillar_reviews': pillar_reviews,
+        'report_version': "1.0"
+    }
+
 @app.route('/generate_report')
 @app.route('/report')  # Add alias for common URL pattern
 def generate_report():
@@ -800,6 +1133,13 @@ def generate_report():
         workload = workload_response.get('Workload', {})
         debug_print(f"Processing workload: {workload.get('WorkloadName', 'Unknown')}")
         
+        # Summary mode renders from ListAnswers alone; details load on expand
+        report_mode = request.args.get('mode', REPORT_MODE)
+        if report_mode == 'summary':
+            selected_pillars = session.get('selected_pillars', list(PILLARS.keys()))
+            summary_report = build_summary_report(wa_client, workload_id, workload, selected_pillars)
+            return render_template('generate_report.html', report_mode='summary', **summary_report)
+        
         # Initialize data structures
         report_data = {
             'workload': workload,
@@ -868,15 +1208,11 @@ def generate_report():
                     'NONE': 0
                 }
                 
-                for answer in answers:
+                # Fetch detailed answers concurrently, in question order
+                for answer, detailed_answer, fetch_error in fetch_answer_details(wa_client, workload_id, answers):
                     try:
-                        # Get detailed answer
-                        detail_response = wa_client.get_answer(
-                            WorkloadId=workload_id,
-                            LensAlias='wellarchitected',
-                            QuestionId=answer['QuestionId']
-                        )
-                        detailed_answer = detail_response.get('Answer', {})
+                        if fetch_error is not None:
+                            raise fetch_error
                         
                         # Ensure we have choice data - the get_answer call should include it
                         choices = detailed_answer.get('Choices', [])
@@ -957,6 +1293,9 @@ def generate_report():
                         detailed_answers.append(minimal_answer)
                         continue
                 
+                # Warm the lens catalog with the static content we just fetched
+                lens_catalog.add_answers('wellarchitected', get_lens_version(wa_client, workload_id), detailed_answers)
+                
                 # Add pillar question count to overall totals
                 pillar_question_count = len(answers)
                 report_data['summary']['total_questions'] += pillar_question_count
@@ -1064,6 +1403,7 @@ def generate_report():
         
         
         return render_template('generate_report.html', 
+                             report_mode='full',
                              report_data=report_data,
                              workload=workload,
                              pillars=PILLARS,
@@ -1120,49 +1460,32 @@ def save_report():
             workload_response = wa_client.get_workload(WorkloadId=workload_id)
             workload = workload_response.get('Workload', {})
             
-            # Initialize basic report structure
-            report_data = {
-                'workload': workload,
-                'pillars': {},
-                'generated_at': datetime.now(timezone.utc).isoformat(),
-                'summary': {
-                    'total_questions': 0,
-                    'answered_questions': 0,
-                    'high_risks': 0,
-                    'medium_risks': 0,
-                    'low_risks': 0,
-                    'no_risks': 0
-                }
-            }
-            
-            # Get basic pillar data for saving
-            for pillar_id, pillar_name in PILLARS.items():
-                try:
-                    answers = get_all_pillar_answers(wa_client, workload_id, pillar_id)
-                    report_data['pillars'][pillar_id] = {
-                        'name': pillar_name,
-                        'question_count': len(answers)
-                    }
-                    report_data['summary']['total_questions'] += len(answers)
-                except Exception as e:
-                    print(f"Error processing pillar {pillar_id}: {e}")
-                    continue
+            # Build per-question pillar data from ListAnswers summaries so saved
+            # reports can be viewed and compared without a GetAnswer per question
+            report_data = build_summary_report(wa_client, workload_id, workload, list(PILLARS.keys()))['report_data']
+            lens_version = get_lens_version(wa_client, workload_id)
             
         except Exception as e:
             print(f"Error generating report data for saving: {e}")
             flash('Error generating report data', 'error')
             return redirect(url_for('generate_report'))
         
+        # Answered from the saved Merkle hashes, without loading earlier reports
+        unchanged = not report_manager.has_changes_since_last_report(workload_id, report_data)
+        
         # Save report using ReportManager
         report_id = report_manager.save_report(
             workload_id=workload_id,
             workload_name=workload_name,
             report_data=report_data,
             user_notes=user_notes,
-            custom_name=custom_name
+            custom_name=custom_name,
+            lens_version=lens_version or ""
         )
         
         flash(f'Report saved successfully! Report ID: {report_id}', 'success')
+        if unchanged:
+            flash('No answers changed since the previous saved report of this workload.', 'info')
         return redirect(url_for('saved_reports'))
         
     except Exception as e:
@@ -1213,20 +1536,34 @@ def view_saved_report(report_id):
         overall_risk_counts = {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0, 'NONE': 0}
         
         if 'pillars' in report_data:
+            summary_pillars = metadata.get('summary', {}).get('pillars', {})
             for pillar_id, pillar_data in report_data['pillars'].items():
-                questions = pillar_data.get('questions', [])
+                pillar_summary = summary_pillars.get(pillar_id)
+                pillar_risk_counts = {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0, 'NONE': 0}
                 
-                # Calculate pillar statistics
-                total_questions = len(questions)
-                answered_questions = sum(1 for q in questions if q.get('SelectedChoices'))
+                if pillar_summary:
+                    # Counted at save time, so the pillar's questions are not loaded
+                    total_questions = pillar_summary.get('questions', 0)
+                    answered_questions = pillar_summary.get('answered', 0)
+                    pillar_risk_counts['HIGH'] = pillar_summary.get('high_risks', 0)
+                    pillar_risk_counts['MEDIUM'] = pillar_summary.get('medium_risks', 0)
+                    pillar_risk_counts['LOW'] = pillar_summary.get('low_risks', 0)
+                    pillar_risk_counts['NONE'] = pillar_summary.get('no_risks', 0)
+                else:
+                    questions = pillar_data.get('questions', [])
+                    
+                    # Calculate pillar statistics
+                    total_questions = len(questions)
+                    answered_questions = sum(1 for q in questions if q.get('SelectedChoices'))
+                    
+                    # Calculate risk counts for this pillar
+                    for question in questions:
+                        risk = question.get('Risk')
+                        if risk in pillar_risk_counts:
+                            pillar_risk_counts[risk] += 1
                 
-                # Calculate risk counts for this pillar
-                pillar_risk_counts = {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0, 'NONE': 0}
-                for question in questions:
-                    risk = question.get('Risk')
-                    if risk in pillar_risk_counts:
-                        pillar_risk_counts[risk] += 1
-                        overall_risk_counts[risk] += 1  # Add to overall counts
+                for risk, count in pillar_risk_counts.items():
+                    overall_risk_counts[risk] += count  # Add to overall counts
                 
                 pillar_reviews[pillar_id] = {
                     'stats': {
@@ -1336,6 +1673,14 @@ def compare_reports_result():
         flash(f'Error comparing reports: {str(e)}', 'danger')
         return redirect(url_for('compare_reports'))
 
+@app.route('/api/saved-reports/cache-stats')
+def api_saved_report_cache_stats():
+    """API endpoint for saved report cache counters."""
+    if 'aws_region' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    return jsonify(report_manager.cache_stats())
+
 # ============================================================================
 # UTILITY FUNCTIONS
 # ============================================================================
@@ -1498,8 +1843,9 @@ def recommendations():
         return redirect(url_for('aws_login'))
     
     try:
-        # Get all recommendations
-        recommendations_data = get_all_trusted_advisor_recommendations()
+        # Get all recommendations; served from the account snapshot unless a refresh is requested
+        force_refresh = request.args.get('refresh') == '1'
+        recommendations_data = get_all_trusted_advisor_recommendations(force_refresh=force_refresh)
         
         if 'error' in recommendations_data:
             flash(f'Trusted Advisor Error: {recommendations_data["error"]}', 'warning')
@@ -1531,7 +1877,8 @@ def recommendations():
                              categories=categories,
                              category_info=category_info,
                              stats=stats,
-                             last_updated=recommendations_data.get('last_updated'))
+                             last_updated=recommendations_data.get('last_updated'),
+                             snapshot_age_text=recommendations_data.get('snapshot_age_text'))
     
     except Exception as e:
         if DEBUG_ENABLED:
@@ -1544,25 +1891,46 @@ def recommendations():
 
 @app.route('/recommendations/refresh/<check_id>')
 def refresh_recommendation(check_id):
-    """Refresh a specific Trusted Advisor check."""
+    """Queue a refresh of a specific Trusted Advisor check."""
     if DEBUG_ENABLED:
         print(f"DEBUG: Refreshing Trusted Advisor check: {check_id}")
     
+    wants_json = request.accept_mimetypes.best == 'application/json'
+    
     if 'aws_region' not in session:
+        if wants_json:
+            return jsonify({'error': 'Not authenticated'}), 401
         flash('Please connect to AWS first', 'warning')
         return redirect(url_for('aws_login'))
     
     try:
-        success = refresh_trusted_advisor_check(check_id)
-        if success:
-            flash('Trusted Advisor check refresh initiated. Results will be updated shortly.', 'success')
+        refresh_state = refresh_trusted_advisor_check(check_id)
+        if wants_json:
+            if refresh_state is None:
+                return jsonify({'error': 'Failed to queue Trusted Advisor check refresh'}), 502
+            return jsonify(refresh_state), 202
+        
+        if refresh_state:
+            flash('Trusted Advisor check refresh queued. Results will be updated shortly.', 'success')
         else:
             flash('Failed to refresh Trusted Advisor check. Please try again.', 'error')
     except Exception as e:
+        if wants_json:
+            return jsonify({'error': str(e)}), 500
         flash(f'Error refreshing check: {str(e)}', 'error')
     
     return redirect(url_for('recommendations'))
 
+@app.route('/api/trusted-advisor/refresh-status')
+def api_trusted_advisor_refresh_status():
+    """API endpoint for the progress of queued Trusted Advisor check refreshes."""
+    if 'aws_region' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    check_ids = request.args.get('check_ids')
+    check_ids = set(check_ids.split(',')) if check_ids else None
+    return jsonify(get_trusted_advisor_refresh_status(check_ids))
+
 @app.route('/api/trusted-advisor/summary')
 def api_trusted_advisor_summary():
     """API endpoint for Trusted Advisor summary data."""
@@ -1575,6 +1943,28 @@ def api_trusted_advisor_summary():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/trusted-advisor/checks/<check_id>/resources')
+def api_trusted_advisor_resources(check_id):
+    """API endpoint for one page of a check's flagged resources."""
+    if 'aws_region' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    try:
+        page = get_flagged_resources_page(
+            check_id,
+            page=request.args.get('page', 1, type=int),
+            page_size=request.args.get('page_size', 25, type=int),
+            status=request.args.get('status') or None,
+            region=request.args.get('region') or None,
+            search=request.args.get('q') or None,
+            change=request.args.get('change') or None
+        )
+        if 'error' in page:
+            return jsonify(page), 502
+        return jsonify(page)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 if __name__ == '__main__':
     # Get configuration from environment variables
     debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
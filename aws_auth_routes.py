@@ -137,6 +137,7 @@ def register_auth_routes(app):
         # Get authenticator and clear it
         auth = get_aws_authenticator()
         auth.clear_authentication()
+        profile = session.get('aws_profile')
         
         # Clear Flask session
         session.pop('aws_authenticated', None)
@@ -152,7 +153,7 @@ def register_auth_routes(app):
         
         # Clear current session
         from aws_helper import clear_current_session
-        clear_current_session()
+        clear_current_session(profile)
         
         flash('Successfully logged out from AWS', 'info')
         return redirect(url_for('aws_login'))
@@ -163,13 +164,14 @@ def register_auth_routes(app):
         # Get authenticator and clear it
         auth = get_aws_authenticator()
         auth.clear_authentication()
+        profile = session.get('aws_profile')
         
         # Clear all session data
         session.clear()
         
         # Clear current session
         from aws_helper import clear_current_session
-        clear_current_session()
+        clear_current_session(profile)
         
         flash('All session data cleared', 'info')
         return redirect(url_for('aws_login'))
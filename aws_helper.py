@@ -10,50 +10,187 @@ Author: Mohamed Toraif
 License: MIT
 """
 
+import os
+import threading
+import time
+from collections import OrderedDict
+
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from flask import session
 
-def get_aws_session():
+# Client pool limits - override via environment for larger deployments
+CLIENT_POOL_MAX_SIZE = int(os.environ.get('AWS_CLIENT_POOL_SIZE', '32'))
+CLIENT_POOL_IDLE_TTL = int(os.environ.get('AWS_CLIENT_POOL_IDLE_TTL', '900'))
+# HTTPS connections per pooled client. Concurrent requests share one client and each
+# fans out up to WA_ANSWER_FETCH_WORKERS calls, more than botocore's default of 10.
+CLIENT_MAX_POOL_CONNECTIONS = int(os.environ.get(
+    'AWS_MAX_POOL_CONNECTIONS', str(4 * max(1, int(os.environ.get('WA_ANSWER_FETCH_WORKERS', '8'))))
+))
+
+
+# Default of AWSClientPool.clear; None stands for the default credential chain
+ALL_PROFILES = object()
+
+
+class AWSClientPool:
     """
-    Get an AWS session based on the stored session information.
-    Returns None if no valid session can be created.
+    Thread-safe, process-wide pool of boto3 sessions and clients.
+    
+    Sessions are keyed by (profile, region) and clients by (profile, region, service),
+    so every request for the same account/region reuses the resolved credential chain,
+    the loaded botocore service model and the client's HTTPS connection pool.
+    Entries are evicted least-recently-used once the pool is full and expire after
+    sitting idle for longer than idle_ttl seconds.
     """
-    if 'aws_region' not in session:
-        return None
     
-    try:
-        region = session['aws_region']
-        profile = session.get('aws_profile')
+    def __init__(self, max_size=CLIENT_POOL_MAX_SIZE, idle_ttl=CLIENT_POOL_IDLE_TTL):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self._clients = OrderedDict()
+    
+    def get_session(self, profile, region):
+        """Return the pooled boto3 session for a profile/region, creating it if needed."""
+        key = (self._normalize_profile(profile), region)
+        with self._lock:
+            return self._get_session_locked(key)
+    
+    def get_client(self, profile, region, service):
+        """Return the pooled client for a profile/region/service, creating it if needed."""
+        profile = self._normalize_profile(profile)
+        key = (profile, region, service)
+        
+        with self._lock:
+            now = time.monotonic()
+            self._evict_expired(self._clients, now)
+            
+            entry = self._clients.get(key)
+            if entry is not None:
+                self._clients.move_to_end(key)
+                entry[1] = now
+                return entry[0]
+            
+            # boto3 sessions are not thread-safe, so clients are built under the lock
+            aws_session = self._get_session_locked((profile, region))
+            client = aws_session.client(
+                service, region_name=region,
+                config=Config(max_pool_connections=CLIENT_MAX_POOL_CONNECTIONS)
+            )
+            self._clients[key] = [client, now]
+            self._evict_overflow(self._clients)
+            return client
+    
+    def clear(self, profile=ALL_PROFILES):
+        """Drop pooled sessions and clients, optionally only those for one profile."""
+        clear_all = profile is ALL_PROFILES
+        profile = None if clear_all else self._normalize_profile(profile)
+        with self._lock:
+            for entries in (self._sessions, self._clients):
+                if clear_all:
+                    entries.clear()
+                else:
+                    for key in [key for key in entries if key[0] == profile]:
+                        del entries[key]
+    
+    def stats(self):
+        """Return the current pool occupancy."""
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'clients': len(self._clients),
+                'max_size': self.max_size,
+                'idle_ttl': self.idle_ttl
+            }
+    
+    def _get_session_locked(self, key):
+        now = time.monotonic()
+        self._evict_expired(self._sessions, now)
+        
+        entry = self._sessions.get(key)
+        if entry is not None:
+            self._sessions.move_to_end(key)
+            entry[1] = now
+            return entry[0]
         
-        # Create session
-        if profile and profile != 'default':
+        profile, region = key
+        if profile:
             aws_session = boto3.Session(profile_name=profile, region_name=region)
         else:
             aws_session = boto3.Session(region_name=region)
         
+        self._sessions[key] = [aws_session, now]
+        self._evict_overflow(self._sessions)
         return aws_session
+    
+    def _evict_expired(self, entries, now):
+        # OrderedDict is kept in last-used order, so expired entries sit at the front
+        while entries:
+            key, entry = next(iter(entries.items()))
+            if now - entry[1] <= self.idle_ttl:
+                break
+            del entries[key]
+    
+    def _evict_overflow(self, entries):
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+    
+    @staticmethod
+    def _normalize_profile(profile):
+        return profile if profile and profile != 'default' else None
+
+
+# Global client pool shared by all requests in this process
+client_pool = AWSClientPool()
+
+
+def get_aws_session():
+    """
+    Get an AWS session based on the stored session information.
+    Returns None if no valid session can be created.
+    """
+    if 'aws_region' not in session:
+        return None
+    
+    try:
+        return client_pool.get_session(session.get('aws_profile'), session['aws_region'])
         
     except Exception as e:
         print(f"Error creating AWS session: {e}")
         return None
 
 
-def get_wellarchitected_client():
+def get_aws_client(service, region=None):
     """
-    Get a Well-Architected client using the current session.
+    Get a pooled client for an AWS service using the current session.
+    
+    Args:
+        service: boto3 service name, e.g. 'wellarchitected'
+        region: Optional region override (defaults to the session region)
     """
-    aws_session = get_aws_session()
-    if not aws_session:
+    if 'aws_region' not in session:
         return None
     
     try:
-        return aws_session.client('wellarchitected')
+        return client_pool.get_client(
+            session.get('aws_profile'),
+            region or session['aws_region'],
+            service
+        )
     except Exception as e:
-        print(f"Error creating Well-Architected client: {e}")
+        print(f"Error creating {service} client: {e}")
         return None
 
 
+def get_wellarchitected_client():
+    """
+    Get a Well-Architected client using the current session.
+    """
+    return get_aws_client('wellarchitected')
+
+
 def test_aws_connection():
     """
     Test the AWS connection by making a simple API call.
@@ -64,19 +201,22 @@ def test_aws_connection():
         if not aws_session:
             return False, "No AWS session available", {}
         
+        profile = session.get('aws_profile')
+        region = aws_session.region_name
+        
         # Test STS connection
-        sts_client = aws_session.client('sts')
+        sts_client = client_pool.get_client(profile, region, 'sts')
         identity = sts_client.get_caller_identity()
         
         # Test Well-Architected connection
-        wa_client = aws_session.client('wellarchitected')
+        wa_client = client_pool.get_client(profile, region, 'wellarchitected')
         workloads = wa_client.list_workloads(MaxResults=1)
         
         account_info = {
             'account_id': identity.get('Account'),
             'user_id': identity.get('UserId'),
             'arn': identity.get('Arn'),
-            'region': aws_session.region_name,
+            'region': region,
             'workload_count': len(workloads.get('WorkloadSummaries', []))
         }
         
@@ -103,7 +243,7 @@ def get_account_alias():
         if not aws_session:
             return None
         
-        iam_client = aws_session.client('iam')
+        iam_client = get_aws_client('iam')
         aliases = iam_client.list_account_aliases()
         
         if aliases['AccountAliases']:
@@ -115,8 +255,9 @@ def get_account_alias():
         return None
 
 
-def clear_current_session():
-    """Clear the current session (placeholder for compatibility)."""
-    # Since we're using profile-based authentication only,
-    # this function is mainly for compatibility with the logout route
-    pass
+def clear_current_session(profile):
+    """Clear the current session by dropping the pooled AWS sessions and clients of its profile."""
+    # Since we're using profile-based authentication only, the Flask session holds
+    # no credentials; pooled clients are rebuilt from the profile on next use.
+    # Other users' profiles stay pooled.
+    client_pool.clear(profile)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Offline Route Benchmarks for TorWAR
+Author: Mohamed Toraif
+
+Drives the review, navigation, report and Trusted Advisor routes through the
+Flask test client against the local AWS fakes in fake_aws.py, and reports wall
+time (p50/p95/mean) and AWS API calls per route. No network or AWS account is
+needed, so performance changes can be measured on a laptop.
+
+Usage:
+    python benchmarks/bench_routes.py
+    python benchmarks/bench_routes.py --latency 0.08 --iterations 20 --cold
+    python benchmarks/bench_routes.py --routes review_pillar,generate_report --json results.json
+
+Author: Mohamed Toraif
+License: MIT
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+
+from fake_aws import build_fake_clients  # noqa: E402
+from report_manager import ReportManager  # noqa: E402
+
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class RouteBenchmark:
+    """Runs route scenarios against the TorWAR app wired to fake AWS clients."""
+    
+    def __init__(self, args):
+        self.args = args
+        self.account, self.clients = build_fake_clients(
+            latency=args.latency,
+            jitter=args.jitter,
+            throttle_rate=args.throttle_rate,
+            seed=args.seed,
+            ta_checks=args.ta_checks,
+            ta_max_resources=args.ta_max_resources,
+            page_size=args.page_size
+        )
+        self.work_dir = tempfile.mkdtemp(prefix='torwar-bench-')
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            import aws_helper
+            import app as torwar_app
+        
+        # Every AWS client in the app is obtained through the shared client pool
+        aws_helper.client_pool.get_client = lambda profile, region, service: self.clients[service]
+        
+        self.app_module = torwar_app
+        self.app_module.report_manager = ReportManager(os.path.join(self.work_dir, 'reports'))
+        self.reset_lens_catalog()
+        
+        self.wa = self.clients['wellarchitected']
+        self.workload_id = self.wa.workload_ids[0]
+        self.pillar_id = 'security'
+        support = self.clients['support']
+        self.flagged_check_id = max(support.results, key=lambda check_id: len(support.results[check_id]['flaggedResources']))
+        self.navigation_position = 0
+        
+        self.client = self.app_module.app.test_client()
+        with self.client.session_transaction() as flask_session:
+            flask_session['aws_authenticated'] = True
+            flask_session['aws_region'] = 'us-east-1'
+            flask_session['aws_profile'] = 'default'
+            flask_session['aws_account_id'] = '123456789012'
+            flask_session['workload_id'] = self.workload_id
+            flask_session['workload_name'] = self.wa.workloads[self.workload_id]['WorkloadName']
+    
+    def scenarios(self):
+        """Return route name -> callable issuing one request for that route."""
+        question_ids = self.wa.pillar_questions[self.pillar_id]
+        return {
+            'dashboard': lambda: self.client.get('/'),
+            'select_pillars': lambda: self.client.get('/select_pillars'),
+            'review_pillar': lambda: self.client.get(f'/review_pillar/{self.pillar_id}'),
+            'answer_question': lambda: self.client.get(
+                f'/answer/{question_ids[len(question_ids) // 2]}?pillar_id={self.pillar_id}'
+            ),
+            'answer_navigation': self.save_and_next,
+            'generate_report': lambda: self.client.get('/report?mode=full'),
+            'generate_report_summary': lambda: self.client.get('/report?mode=summary'),
+            'recommendations': lambda: self.client.get('/recommendations'),
+            'trusted_advisor_summary_api': lambda: self.client.get('/api/trusted-advisor/summary'),
+            'trusted_advisor_resources_api': lambda: self.client.get(
+                f'/api/trusted-advisor/checks/{self.flagged_check_id}/resources?page=2&region=us-east-1'
+            )
+        }
+    
+    def save_and_next(self):
+        """Submit the current question unchanged and follow the redirect to the next one."""
+        question_ids = self.wa.pillar_questions[self.pillar_id]
+        question_id = question_ids[self.navigation_position % len(question_ids)]
+        self.navigation_position += 1
+        state = self.wa.answers[(self.workload_id, question_id)]
+        
+        return self.client.post(
+            f'/answer/{question_id}',
+            data={
+                'pillar_id': self.pillar_id,
+                'choices': state['SelectedChoices'],
+                'notes': state['Notes'],
+                'save_and_next': '1'
+            },
+            follow_redirects=True
+        )
+    
+    def reset_lens_catalog(self):
+        from lens_catalog import LensCatalog
+        from ta_check_catalog import TrustedAdvisorCheckCatalog
+        import trusted_advisor_helper
+        self.app_module.lens_catalog = LensCatalog(tempfile.mkdtemp(dir=self.work_dir, prefix='lens-'))
+        self.app_module.report_manager.lens_catalog = self.app_module.lens_catalog
+        trusted_advisor_helper.check_catalog = TrustedAdvisorCheckCatalog(
+            tempfile.mkdtemp(dir=self.work_dir, prefix='ta-checks-')
+        )
+    
+    def reset_caches(self):
+        """Drop every in-process cache, answer state and on-disk catalog so the next request starts cold."""
+        from answer_writer import answer_writer
+        from wa_cache import (
+            answer_cache, question_index_cache, lens_version_cache, pillar_stats_cache, lens_associations
+        )
+        from trusted_advisor_helper import trusted_advisor_cache, flagged_resource_cache
+        answer_cache.clear()
+        question_index_cache.clear()
+        lens_version_cache.clear()
+        pillar_stats_cache.clear()
+        lens_associations.forget(self.workload_id)
+        trusted_advisor_cache.clear()
+        flagged_resource_cache.clear()
+        answer_writer.clear()
+        self.app_module.report_manager.report_cache.clear()
+        self.reset_lens_catalog()
+    
+    def run_route(self, name, request):
+        """Run one route for the configured iterations and collect measurements."""
+        durations = []
+        calls = Counter()
+        throttled = Counter()
+        errors = 0
+        
+        for _ in range(self.args.warmup):
+            with contextlib.redirect_stdout(io.StringIO()):
+                request()
+        
+        for _ in range(self.args.iterations):
+            if self.args.cold:
+                self.reset_caches()
+            
+            before_calls, before_throttled = self.account.snapshot()
+            start = time.perf_counter()
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output if not self.args.verbose else sys.stdout):
+                response = request()
+            durations.append(time.perf_counter() - start)
+            after_calls, after_throttled = self.account.snapshot()
+            
+            calls.update(after_calls - before_calls)
+            throttled.update(after_throttled - before_throttled)
+            if response.status_code >= 400:
+                errors += 1
+        
+        iterations = max(1, self.args.iterations)
+        return {
+            'route': name,
+            'requests': self.args.iterations,
+            'p50_ms': percentile(durations, 50) * 1000,
+            'p95_ms': percentile(durations, 95) * 1000,
+            'mean_ms': (sum(durations) / iterations) * 1000,
+            'total_s': sum(durations),
+            'aws_calls_per_request': sum(calls.values()) / iterations,
+            'aws_calls_by_operation': {operation: count / iterations for operation, count in sorted(calls.items())},
+            'throttled': sum(throttled.values()),
+            'http_errors': errors
+        }
+    
+    def run(self):
+        """Run every selected scenario and return the results."""
+        scenarios = self.scenarios()
+        selected = self.args.routes.split(',') if self.args.routes else list(scenarios.keys())
+        unknown = [name for name in selected if name not in scenarios]
+        if unknown:
+            raise SystemExit(f"Unknown route(s): {', '.join(unknown)}. Choose from: {', '.join(scenarios)}")
+        
+        results = []
+        for name in selected:
+            results.append(self.run_route(name, scenarios[name]))
+        return results
+
+
+def print_results(results, args):
+    """Print a results table."""
+    mode = 'cold caches' if args.cold else 'warm caches'
+    print(f"TorWAR route benchmark - latency {args.latency * 1000:.0f}ms (+{args.jitter * 1000:.0f}ms jitter), "
+          f"throttle rate {args.throttle_rate:.0%}, {args.iterations} iterations, {mode}")
+    print()
+    header = f"{'route':<30}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'AWS calls':>11}{'throttled':>11}{'errors':>8}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print(f"{result['route']:<30}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['mean_ms']:>10.1f}"
+              f"{result['aws_calls_per_request']:>11.1f}{result['throttled']:>11}{result['http_errors']:>8}")
+    print()
+    print(f"Total wall time: {sum(result['total_s'] for result in results):.2f}s")
+    
+    if args.show_operations:
+        print()
+        for result in results:
+            operations = ', '.join(f"{operation}={count:g}" for operation, count in result['aws_calls_by_operation'].items())
+            print(f"{result['route']}: {operations or 'no AWS calls'}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmarks for TorWAR review and report routes.')
+    parser.add_argument('--latency', type=float, default=0.05, help='Base seconds per AWS call (default 0.05)')
+    parser.add_argument('--jitter', type=float, default=0.01, help='Max random extra seconds per call (default 0.01)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Probability a call is throttled (0-1)')
+    parser.add_argument('--iterations', type=int, default=10, help='Measured requests per route (default 10)')
+    parser.add_argument('--warmup', type=int, default=1, help='Unmeasured requests per route (default 1)')
+    parser.add_argument('--cold', action='store_true', help='Clear in-process caches before every request')
+    parser.add_argument('--routes', default='', help='Comma-separated routes to run (default: all)')
+    parser.add_argument('--page-size', type=int, default=50, help='ListAnswers page size of the fake (default 50)')
+    parser.add_argument('--ta-checks', type=int, default=115, help='Number of fake Trusted Advisor checks')
+    parser.add_argument('--ta-max-resources', type=int, default=200, help='Max flagged resources per fake check')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for data and throttling')
+    parser.add_argument('--show-operations', action='store_true', help='Print AWS calls per operation')
+    parser.add_argument('--json', dest='json_path', help='Also write results to this JSON file')
+    parser.add_argument('--verbose', action='store_true', help='Show application output')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = RouteBenchmark(args).run()
+    print_results(results, args)
+    
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'arguments': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Trusted Advisor Flagged Resource Memory Benchmark for TorWAR
+Author: Mohamed Toraif
+
+Compares the memory held per Trusted Advisor snapshot by the dict-per-row
+layout (raw flaggedResources plus a format_trusted_advisor_resource dict per
+row) with the compact FlaggedResourceTable, with and without string interning.
+
+Check results are round-tripped through JSON first so that, as with botocore
+responses, every row carries its own string objects.
+
+Usage:
+    python benchmarks/bench_ta_memory.py
+    python benchmarks/bench_ta_memory.py --checks 40 --resources 5000
+
+Author: Mohamed Toraif
+License: MIT
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+
+from fake_aws import FakeAWSAccount, FakeSupportClient  # noqa: E402
+from ta_resource_store import FlaggedResourceTable  # noqa: E402
+from trusted_advisor_helper import format_trusted_advisor_resource  # noqa: E402
+
+
+def load_check_results(args):
+    """Return (check definitions, check results serialized as JSON text)."""
+    support = FakeSupportClient(
+        FakeAWSAccount(latency=0, jitter=0),
+        check_count=args.checks,
+        max_flagged_resources=args.resources,
+        seed=args.seed
+    )
+    flagged = {check_id: result for check_id, result in support.results.items() if result['flaggedResources']}
+    checks = {check['id']: check for check in support.checks if check['id'] in flagged}
+    return checks, json.dumps(flagged)
+
+
+def build_dict_rows(checks, results):
+    """The dict-per-row layout: raw results kept next to formatted dicts."""
+    snapshot = {}
+    for check_id, result in results.items():
+        metadata = checks[check_id]['metadata']
+        snapshot[check_id] = {
+            'flagged_resources': result['flaggedResources'],
+            'formatted': [format_trusted_advisor_resource(resource, metadata) for resource in result['flaggedResources']]
+        }
+    return snapshot
+
+
+def build_tables(checks, results, intern_strings):
+    """The compact layout: one FlaggedResourceTable per check."""
+    return {
+        check_id: FlaggedResourceTable.from_result(result, checks[check_id]['metadata'], intern_strings=intern_strings)
+        for check_id, result in results.items()
+    }
+
+
+def measure(label, build, args):
+    """Measure the bytes still allocated by a layout after it is built."""
+    checks, payload = load_check_results(args)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    
+    # Parse inside the trace so strings kept from the response are counted
+    results = json.loads(payload)
+    layout = build(checks, results)
+    # Results are dropped; only what the layout references stays alive
+    del results
+    gc.collect()
+    
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    rows = sum(len(entry) if isinstance(entry, FlaggedResourceTable) else len(entry['formatted'])
+               for entry in layout.values())
+    return {'layout': label, 'rows': rows, 'bytes': retained, 'bytes_per_row': retained / max(1, rows)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Memory use of Trusted Advisor flagged resource layouts.')
+    parser.add_argument('--checks', type=int, default=115, help='Number of fake Trusted Advisor checks')
+    parser.add_argument('--resources', type=int, default=2000, help='Max flagged resources per check')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for the fake data')
+    parser.add_argument('--json', dest='json_path', help='Also write results to this JSON file')
+    args = parser.parse_args(argv)
+    
+    results = [
+        measure('dict per row (raw + formatted)', build_dict_rows, args),
+        measure('FlaggedResourceTable', lambda checks, data: build_tables(checks, data, False), args),
+        measure('FlaggedResourceTable (interned)', lambda checks, data: build_tables(checks, data, True), args)
+    ]
+    
+    baseline = results[0]['bytes'] or 1
+    print(f"Trusted Advisor flagged resource memory - {args.checks} checks, up to {args.resources} resources each")
+    print()
+    header = f"{'layout':<36}{'rows':>10}{'MiB':>10}{'bytes/row':>12}{'vs dict':>10}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print(f"{result['layout']:<36}{result['rows']:>10}{result['bytes'] / 1048576:>10.1f}"
+              f"{result['bytes_per_row']:>12.0f}{result['bytes'] / baseline:>10.0%}")
+    
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'arguments': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
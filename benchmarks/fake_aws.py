@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Offline AWS Stand-ins for TorWAR Benchmarks
+Author: Mohamed Toraif
+
+Local fakes of the Well-Architected, Support (Trusted Advisor), STS and IAM
+APIs used by TorWAR. They serve realistic six-pillar / 57-question review data
+and Trusted Advisor checks with configurable per-call latency and throttling,
+and count every call so benchmarks can report AWS traffic per route.
+
+Author: Mohamed Toraif
+License: MIT
+"""
+
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+# Question counts per pillar of the Well-Architected Framework lens (57 total)
+PILLAR_QUESTION_COUNTS = {
+    'operationalExcellence': 11,
+    'security': 11,
+    'reliability': 13,
+    'performance': 5,
+    'costOptimization': 11,
+    'sustainability': 6
+}
+
+PILLAR_PREFIXES = {
+    'operationalExcellence': 'OPS',
+    'security': 'SEC',
+    'reliability': 'REL',
+    'performance': 'PERF',
+    'costOptimization': 'COST',
+    'sustainability': 'SUS'
+}
+
+TRUSTED_ADVISOR_CATEGORIES = ['cost_optimizing', 'performance', 'security', 'fault_tolerance', 'service_limits']
+AWS_REGIONS = ['us-east-1', 'us-west-2', 'eu-west-1', 'eu-central-1', 'ap-southeast-1', 'me-south-1']
+LENS_VERSION = '2024-06-27'
+
+
+class FakeAWSAccount:
+    """Shared call accounting, latency and throttling for all fake clients."""
+    
+    def __init__(self, latency=0.05, jitter=0.01, throttle_rate=0.0, seed=42):
+        """
+        Initialize the fake account.
+        
+        Args:
+            latency: Base seconds added to every API call
+            jitter: Maximum extra random seconds per call
+            throttle_rate: Probability (0-1) that a call raises ThrottlingException
+            seed: Random seed for reproducible data and throttling
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = Counter()
+        self.throttled = Counter()
+    
+    def api_call(self, operation):
+        """Record a call, sleep for the simulated latency and maybe throttle."""
+        with self._lock:
+            self.calls[operation] += 1
+            delay = self.latency + self._random.random() * self.jitter
+            throttle = self._random.random() < self.throttle_rate
+        
+        if delay > 0:
+            time.sleep(delay)
+        
+        if throttle:
+            with self._lock:
+                self.throttled[operation] += 1
+            raise ClientError(
+                {'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}},
+                operation
+            )
+    
+    def reset_counts(self):
+        """Reset call and throttle counters."""
+        with self._lock:
+            self.calls.clear()
+            self.throttled.clear()
+    
+    def snapshot(self):
+        """Return a copy of the current call counters."""
+        with self._lock:
+            return Counter(self.calls), Counter(self.throttled)
+
+
+class FakeWellArchitectedClient:
+    """In-memory stand-in for the boto3 'wellarchitected' client."""
+    
+    def __init__(self, account, workload_count=3, page_size=50, seed=42):
+        self.account = account
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        rng = random.Random(seed)
+        
+        self.questions = {}
+        self.pillar_questions = {}
+        for pillar_id, count in PILLAR_QUESTION_COUNTS.items():
+            prefix = PILLAR_PREFIXES[pillar_id]
+            self.pillar_questions[pillar_id] = []
+            for number in range(1, count + 1):
+                question_id = f"{prefix.lower()}-question-{number:02d}"
+                self.pillar_questions[pillar_id].append(question_id)
+                self.questions[question_id] = self._build_question(pillar_id, prefix, number, question_id, rng)
+        
+        self.workloads = {}
+        self.answers = {}
+        for index in range(1, workload_count + 1):
+            workload_id = f"{index:032x}"
+            self.workloads[workload_id] = {
+                'WorkloadId': workload_id,
+                'WorkloadArn': f"arn:aws:wellarchitected:us-east-1:123456789012:workload/{workload_id}",
+                'WorkloadName': f"Benchmark Workload {index}",
+                'Description': 'Synthetic workload for offline benchmarks',
+                'Environment': 'PRODUCTION',
+                'AccountIds': ['123456789012'],
+                'AwsRegions': ['us-east-1'],
+                'ReviewOwner': 'benchmark@example.com',
+                'Lenses': ['wellarchitected'],
+                'UpdatedAt': datetime.now(timezone.utc)
+            }
+            for question_id, question in self.questions.items():
+                self.answers[(workload_id, question_id)] = self._build_answer_state(question, rng)
+    
+    @property
+    def workload_ids(self):
+        return list(self.workloads.keys())
+    
+    # ------------------------------------------------------------------
+    # API operations
+    # ------------------------------------------------------------------
+    
+    def list_workloads(self, MaxResults=50, **kwargs):
+        self.account.api_call('wellarchitected.ListWorkloads')
+        summaries = [
+            {key: workload[key] for key in ('WorkloadId', 'WorkloadArn', 'WorkloadName', 'Lenses', 'UpdatedAt')}
+            for workload in self.workloads.values()
+        ]
+        return {'WorkloadSummaries': summaries[:MaxResults]}
+    
+    def get_workload(self, WorkloadId):
+        self.account.api_call('wellarchitected.GetWorkload')
+        return {'Workload': dict(self._workload(WorkloadId))}
+    
+    def create_workload(self, WorkloadName, **kwargs):
+        self.account.api_call('wellarchitected.CreateWorkload')
+        workload_id = f"{len(self.workloads) + 1:032x}"
+        with self._lock:
+            self.workloads[workload_id] = dict(kwargs, WorkloadId=workload_id, WorkloadName=WorkloadName)
+            for question_id in self.questions:
+                self.answers[(workload_id, question_id)] = {
+                    'SelectedChoices': [], 'Notes': '', 'IsApplicable': True, 'Reason': 'NONE', 'Risk': 'UNANSWERED'
+                }
+        return {'WorkloadId': workload_id, 'WorkloadArn': f"arn:aws:wellarchitected:::workload/{workload_id}"}
+    
+    def associate_lenses(self, WorkloadId, LensAliases):
+        self.account.api_call('wellarchitected.AssociateLenses')
+        self._workload(WorkloadId)
+        raise ClientError(
+            {'Error': {'Code': 'ConflictException', 'Message': 'Lens is already associated'}},
+            'AssociateLenses'
+        )
+    
+    def get_lens_review(self, WorkloadId, LensAlias, **kwargs):
+        self.account.api_call('wellarchitected.GetLensReview')
+        self._workload(WorkloadId)
+        summaries = []
+        for pillar_id, question_ids in self.pillar_questions.items():
+            risk_counts = Counter(self.answers[(WorkloadId, question_id)]['Risk'] for question_id in question_ids)
+            summaries.append({
+                'PillarId': pillar_id,
+                'PillarName': pillar_id,
+                'RiskCounts': dict(risk_counts)
+            })
+        return {
+            'WorkloadId': WorkloadId,
+            'LensReview': {
+                'LensAlias': LensAlias,
+                'LensVersion': LENS_VERSION,
+                'LensName': 'AWS Well-Architected Framework',
+                'LensStatus': 'CURRENT',
+                'PillarReviewSummaries': summaries
+            }
+        }
+    
+    def list_answers(self, WorkloadId, LensAlias, PillarId=None, NextToken=None, MaxResults=None, **kwargs):
+        self.account.api_call('wellarchitected.ListAnswers')
+        self._workload(WorkloadId)
+        question_ids = self.pillar_questions.get(PillarId, []) if PillarId else list(self.questions.keys())
+        page_size = min(MaxResults or self.page_size, self.page_size)
+        start = int(NextToken or 0)
+        page = question_ids[start:start + page_size]
+        
+        response = {
+            'WorkloadId': WorkloadId,
+            'LensAlias': LensAlias,
+            'AnswerSummaries': [self._answer_summary(WorkloadId, question_id) for question_id in page]
+        }
+        if start + page_size < len(question_ids):
+            response['NextToken'] = str(start + page_size)
+        return response
+    
+    def get_answer(self, WorkloadId, LensAlias, QuestionId, **kwargs):
+        self.account.api_call('wellarchitected.GetAnswer')
+        self._workload(WorkloadId)
+        question = self._question(QuestionId)
+        answer = dict(question)
+        answer.update(self.answers[(WorkloadId, QuestionId)])
+        return {'WorkloadId': WorkloadId, 'LensAlias': LensAlias, 'Answer': answer}
+    
+    def update_answer(self, WorkloadId, LensAlias, QuestionId, SelectedChoices=None, Notes=None,
+                      IsApplicable=True, Reason=None, **kwargs):
+        self.account.api_call('wellarchitected.UpdateAnswer')
+        self._workload(WorkloadId)
+        question = self._question(QuestionId)
+        with self._lock:
+            state = self.answers[(WorkloadId, QuestionId)]
+            if SelectedChoices is not None:
+                state['SelectedChoices'] = list(SelectedChoices)
+            if Notes is not None:
+                state['Notes'] = Notes
+            state['IsApplicable'] = IsApplicable
+            state['Reason'] = Reason or 'NONE'
+            state['Risk'] = self._risk_for(question, state)
+            answer = dict(question)
+            answer.update(state)
+        return {'WorkloadId': WorkloadId, 'LensAlias': LensAlias, 'Answer': answer}
+    
+    # ------------------------------------------------------------------
+    # Data helpers
+    # ------------------------------------------------------------------
+    
+    def _workload(self, workload_id):
+        workload = self.workloads.get(workload_id)
+        if workload is None:
+            raise ClientError(
+                {'Error': {'Code': 'ResourceNotFoundException', 'Message': f'Workload {workload_id} not found'}},
+                'GetWorkload'
+            )
+        return workload
+    
+    def _question(self, question_id):
+        question = self.questions.get(question_id)
+        if question is None:
+            raise ClientError(
+                {'Error': {'Code': 'ResourceNotFoundException', 'Message': f'Question {question_id} not found'}},
+                'GetAnswer'
+            )
+        return question
+    
+    def _answer_summary(self, workload_id, question_id):
+        question = self.questions[question_id]
+        state = self.answers[(workload_id, question_id)]
+        return {
+            'QuestionId': question_id,
+            'PillarId': question['PillarId'],
+            'QuestionTitle': question['QuestionTitle'],
+            'QuestionType': 'PRIORITIZED',
+            'Choices': question['Choices'],
+            'SelectedChoices': list(state['SelectedChoices']),
+            'ChoiceAnswerSummaries': [
+                {'ChoiceId': choice_id, 'Status': 'SELECTED', 'Reason': 'NONE'}
+                for choice_id in state['SelectedChoices']
+            ],
+            'IsApplicable': state['IsApplicable'],
+            'Risk': state['Risk'],
+            'Reason': state['Reason']
+        }
+    
+    @staticmethod
+    def _build_question(pillar_id, prefix, number, question_id, rng):
+        choice_count = rng.randint(4, 8)
+        choices = []
+        for index in range(1, choice_count + 1):
+            choice_id = f"{prefix.lower()}_{number}_choice_{index}"
+            choices.append({
+                'ChoiceId': choice_id,
+                'Title': f"{prefix} {number}.{index} best practice",
+                'Description': f"Guidance for best practice {index} of {prefix} {number}. " * 4,
+                'HelpfulResource': {
+                    'DisplayText': f"Helpful resources for {prefix} {number}.{index}. " * 3,
+                    'Url': f"https://docs.aws.amazon.com/wellarchitected/latest/framework/{question_id}-{index}.html"
+                },
+                'ImprovementPlan': {
+                    'DisplayText': f"Improvement plan for {prefix} {number}.{index}.",
+                    'Url': f"https://docs.aws.amazon.com/wellarchitected/latest/framework/{question_id}-{index}-plan.html"
+                }
+            })
+        choices.append({
+            'ChoiceId': f"{prefix.lower()}_{number}_no",
+            'Title': 'None of these',
+            'Description': 'None of the best practices apply.'
+        })
+        
+        return {
+            'QuestionId': question_id,
+            'PillarId': pillar_id,
+            'QuestionTitle': f"{prefix} {number}. How do you address {pillar_id} area {number}?",
+            'QuestionDescription': f"Description of {prefix} {number}. " * 10,
+            'HelpfulResourceUrl': f"https://docs.aws.amazon.com/wellarchitected/latest/framework/{question_id}.html",
+            'HelpfulResourceDisplayText': f"Learn more about {prefix} {number}.",
+            'ImprovementPlanUrl': f"https://docs.aws.amazon.com/wellarchitected/latest/framework/{question_id}-plan.html",
+            'Choices': choices
+        }
+    
+    @classmethod
+    def _build_answer_state(cls, question, rng):
+        best_practices = [choice['ChoiceId'] for choice in question['Choices'][:-1]]
+        roll = rng.random()
+        if roll < 0.2:
+            selected = []
+        elif roll < 0.25:
+            return {'SelectedChoices': [], 'Notes': '', 'IsApplicable': False,
+                    'Reason': 'OUT_OF_SCOPE', 'Risk': 'NOT_APPLICABLE'}
+        else:
+            selected = rng.sample(best_practices, rng.randint(1, len(best_practices)))
+        
+        state = {
+            'SelectedChoices': selected,
+            'Notes': f"Reviewer notes for {question['QuestionId']}." if selected and rng.random() < 0.5 else '',
+            'IsApplicable': True,
+            'Reason': 'NONE'
+        }
+        state['Risk'] = cls._risk_for(question, state)
+        return state
+    
+    @staticmethod
+    def _risk_for(question, state):
+        if not state.get('IsApplicable', True):
+            return 'NOT_APPLICABLE'
+        selected = [choice for choice in state.get('SelectedChoices', []) if not choice.endswith('_no')]
+        if not state.get('SelectedChoices'):
+            return 'UNANSWERED'
+        coverage = len(selected) / max(1, len(question['Choices']) - 1)
+        if coverage >= 0.9:
+            return 'NONE'
+        if coverage >= 0.6:
+            return 'LOW'
+        if coverage >= 0.3:
+            return 'MEDIUM'
+        return 'HIGH'
+
+
+class FakeSupportClient:
+    """In-memory stand-in for the boto3 'support' client (Trusted Advisor)."""
+    
+    def __init__(self, account, check_count=115, max_flagged_resources=200, seed=42):
+        self.account = account
+        rng = random.Random(seed)
+        self.checks = []
+        self.results = {}
+        self.refresh_statuses = {}
+        
+        for index in range(check_count):
+            category = TRUSTED_ADVISOR_CATEGORIES[index % len(TRUSTED_ADVISOR_CATEGORIES)]
+            check_id = f"ta{index:08x}"
+            metadata = ['Region', 'Resource ID', 'Resource Name', 'Status', 'Detail']
+            self.checks.append({
+                'id': check_id,
+                'name': f"{category.replace('_', ' ').title()} check {index + 1}",
+                'description': f"Synthetic Trusted Advisor check {index + 1}. " * 8,
+                'category': category,
+                'metadata': metadata
+            })
+            
+            roll = rng.random()
+            status = 'ok' if roll < 0.55 else 'warning' if roll < 0.8 else 'error' if roll < 0.9 else 'not_available'
+            flagged_count = 0 if status in ('ok', 'not_available') else rng.randint(1, max_flagged_resources)
+            resources = []
+            for resource_index in range(flagged_count):
+                region = rng.choice(AWS_REGIONS)
+                resource_status = 'error' if status == 'error' and rng.random() < 0.5 else 'warning'
+                resources.append({
+                    'status': resource_status,
+                    'region': region,
+                    'resourceId': f"{check_id}-resource-{resource_index:05d}",
+                    'isSuppressed': False,
+                    'metadata': [region, f"res-{resource_index:05d}", f"resource-{resource_index}",
+                                 resource_status.title(), f"Detail for resource {resource_index}"]
+                })
+            
+            self.results[check_id] = {
+                'checkId': check_id,
+                'timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'status': status,
+                'resourcesSummary': {
+                    'resourcesProcessed': flagged_count + rng.randint(0, 50),
+                    'resourcesFlagged': flagged_count,
+                    'resourcesIgnored': 0,
+                    'resourcesSuppressed': 0
+                },
+                'categorySpecificSummary': {},
+                'flaggedResources': resources
+            }
+            self.refresh_statuses[check_id] = {
+                'checkId': check_id,
+                'status': 'success',
+                'millisUntilNextRefreshIsAllowed': 0
+            }
+    
+    def describe_trusted_advisor_checks(self, language='en'):
+        self.account.api_call('support.DescribeTrustedAdvisorChecks')
+        return {'checks': [dict(check) for check in self.checks]}
+    
+    def describe_trusted_advisor_check_result(self, checkId, language='en'):
+        self.account.api_call('support.DescribeTrustedAdvisorCheckResult')
+        return {'result': self.results[checkId]}
+    
+    def describe_trusted_advisor_check_summaries(self, checkIds):
+        self.account.api_call('support.DescribeTrustedAdvisorCheckSummaries')
+        summaries = []
+        for check_id in checkIds:
+            result = self.results[check_id]
+            summaries.append({key: value for key, value in result.items() if key != 'flaggedResources'})
+            summaries[-1]['hasFlaggedResources'] = bool(result['flaggedResources'])
+        return {'summaries': summaries}
+    
+    def describe_trusted_advisor_check_refresh_statuses(self, checkIds):
+        self.account.api_call('support.DescribeTrustedAdvisorCheckRefreshStatuses')
+        return {'statuses': [dict(self.refresh_statuses[check_id]) for check_id in checkIds]}
+    
+    def refresh_trusted_advisor_check(self, checkId):
+        self.account.api_call('support.RefreshTrustedAdvisorCheck')
+        result = self.results[checkId]
+        result['timestamp'] = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        status = {'checkId': checkId, 'status': 'success', 'millisUntilNextRefreshIsAllowed': 300000}
+        self.refresh_statuses[checkId] = status
+        return {'status': dict(status)}
+
+
+class FakeSTSClient:
+    """In-memory stand-in for the boto3 'sts' client."""
+    
+    def __init__(self, account):
+        self.account = account
+    
+    def get_caller_identity(self):
+        self.account.api_call('sts.GetCallerIdentity')
+        return {
+            'Account': '123456789012',
+            'UserId': 'AIDABENCHMARK',
+            'Arn': 'arn:aws:iam::123456789012:user/benchmark'
+        }
+
+
+class FakeIAMClient:
+    """In-memory stand-in for the boto3 'iam' client."""
+    
+    def __init__(self, account):
+        self.account = account
+    
+    def list_account_aliases(self):
+        self.account.api_call('iam.ListAccountAliases')
+        return {'AccountAliases': ['torwar-benchmark']}
+
+
+def build_fake_clients(latency=0.05, jitter=0.01, throttle_rate=0.0, seed=42,
+                       ta_checks=115, ta_max_resources=200, page_size=50):
+    """
+    Build a fake account and its service clients.
+    
+    Returns:
+        (account, clients) where clients maps boto3 service names to fakes
+    """
+    account = FakeAWSAccount(latency=latency, jitter=jitter, throttle_rate=throttle_rate, seed=seed)
+    clients = {
+        'wellarchitected': FakeWellArchitectedClient(account, page_size=page_size, seed=seed),
+        'support': FakeSupportClient(account, check_count=ta_checks, max_flagged_resources=ta_max_resources, seed=seed),
+        'sts': FakeSTSClient(account),
+        'iam': FakeIAMClient(account)
+    }
+    return account, clients
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Lens Question Catalog for TorWAR
+Author: Mohamed Toraif
+
+Versioned store of static lens content (question titles, descriptions, choices
+and helpful resources). This content is identical for every workload reviewed
+against the same lens version, so it is kept once per version in memory and
+persisted to disk, and joined with per-workload answer state when needed.
+
+Saved reports store only answer state and reference this catalog for the
+question text (see strip_static and restore_static). Stored fields are never
+changed afterwards, and the catalog directory has to be backed up and moved
+together with the reports.
+
+Author: Mohamed Toraif
+License: MIT
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: catalog writes are only serialized within the process
+    fcntl = None
+
+# GetAnswer fields that describe the question itself rather than the workload's answer
+STATIC_QUESTION_FIELDS = (
+    'QuestionId',
+    'PillarId',
+    'QuestionTitle',
+    'QuestionDescription',
+    'QuestionType',
+    'HelpfulResourceUrl',
+    'HelpfulResourceDisplayText',
+    'ImprovementPlanUrl',
+    'Choices'
+)
+
+# Marks catalog entries built from ListAnswers summaries, which lack descriptions
+PARTIAL_KEY = '_partial'
+
+# Lists the static fields removed from a stored answer, to be restored from the catalog
+CATALOG_FIELDS_KEY = '_catalog_fields'
+
+
+class LensCatalog:
+    """Static question content keyed by (lens alias, lens version, question ID)."""
+
+    def __init__(self, data_dir: str = "/app/data/lens_catalog"):
+        """Initialize the catalog with its persistence directory."""
+        self.data_dir = data_dir
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._version_stats = {}
+        self.ensure_data_directory()
+
+    def ensure_data_directory(self):
+        """Ensure the catalog data directory exists."""
+        try:
+            os.makedirs(self.data_dir, exist_ok=True)
+        except Exception as e:
+            print(f"Warning: Could not create lens catalog directory: {e}")
+
+    def get_question(self, lens_alias: str, lens_version: str, question_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the static content of a question.
+
+        Args:
+            lens_alias: Lens alias, e.g. 'wellarchitected'
+            lens_version: Lens version string from the workload's lens review
+            question_id: Question identifier
+
+        Returns:
+            Static question content or None if not (fully) catalogued yet
+        """
+        if not lens_version:
+            return None
+        question = self._load_version(lens_alias, lens_version).get(question_id)
+        if question is None or question.get(PARTIAL_KEY):
+            return None
+        return question
+
+    def add_answers(self, lens_alias: str, lens_version: str, answers: Iterable[Dict[str, Any]],
+                    partial: bool = False) -> int:
+        """
+        Catalog the static content of GetAnswer payloads.
+
+        Args:
+            lens_alias: Lens alias the answers belong to
+            lens_version: Lens version string
+            answers: GetAnswer 'Answer' dictionaries
+            partial: The answers are ListAnswers summaries; their entries are
+                only used by saved reports and replaced by full content later
+
+        Returns:
+            Number of questions newly added to the catalog
+        """
+        if not lens_version:
+            return 0
+
+        answers = list(answers)
+        # Most calls add nothing; check the current copy before locking the file
+        current = self._load_version(lens_alias, lens_version)
+        if not any(self._new_content(current, answer, partial) for answer in answers):
+            return 0
+
+        key = (lens_alias, lens_version)
+        catalog_file = self._catalog_file(lens_alias, lens_version)
+        with self._lock, self._locked_catalog():
+            # Merge into the file as other workers left it, so their entries are kept
+            stat = self._stat(catalog_file)
+            questions = self._read_file(catalog_file)
+            if questions is None:
+                return 0
+
+            added = 0
+            for answer in answers:
+                content = self._new_content(questions, answer, partial)
+                if content is not None:
+                    questions[answer['QuestionId']] = content
+                    added += 1
+
+            if added:
+                if not self._persist_locked(lens_alias, lens_version, questions):
+                    return 0
+                stat = self._stat(catalog_file)
+            # Only content known to be on disk is kept, so strip_static never relies on anything else
+            self._versions[key] = questions
+            self._version_stats[key] = stat
+
+        return added
+
+    def has_version(self, lens_alias: str, lens_version: str) -> bool:
+        """Return True if any content of a lens version is catalogued."""
+        return bool(self._load_version(lens_alias, lens_version))
+
+    def join(self, lens_alias: str, lens_version: str, answer_state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Combine catalogued question content with per-workload answer state.
+
+        Fields present in answer_state take precedence over catalog content.
+        """
+        static = self.get_question(lens_alias, lens_version, answer_state.get('QuestionId'))
+        if not static:
+            return dict(answer_state)
+
+        joined = dict(static)
+        joined.update(answer_state)
+        return joined
+
+    def strip_static(self, lens_alias: str, lens_version: str, question: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Remove the static fields of a question that the catalog already holds.
+
+        Only fields equal to the catalogued content are removed; their names
+        are kept so restore_static rebuilds the exact question.
+        """
+        static = self._load_version(lens_alias, lens_version).get(question.get('QuestionId')) if lens_version else None
+        if not static:
+            return question
+
+        fields = [field for field in STATIC_QUESTION_FIELDS[1:] if field in question and question[field] == static.get(field)]
+        if not fields:
+            return question
+
+        answer_state = {key: value for key, value in question.items() if key not in fields}
+        answer_state[CATALOG_FIELDS_KEY] = fields
+        return answer_state
+
+    def restore_static(self, lens_alias: str, lens_version: str, answer_state: Dict[str, Any]) -> Dict[str, Any]:
+        """Rebuild a question reduced by strip_static."""
+        fields = answer_state.get(CATALOG_FIELDS_KEY)
+        if not fields:
+            return answer_state
+
+        static = self._load_version(lens_alias, lens_version).get(answer_state.get('QuestionId')) or {}
+        question = {key: value for key, value in answer_state.items() if key != CATALOG_FIELDS_KEY}
+        for field in fields:
+            if field in static:
+                question[field] = static[field]
+
+        if not static:
+            print(f"Warning: Lens catalog {lens_alias}/{lens_version} has no content for {answer_state.get('QuestionId')}")
+        return question
+
+    @staticmethod
+    def _new_content(questions: Dict[str, Dict[str, Any]], answer: Dict[str, Any],
+                     partial: bool) -> Optional[Dict[str, Any]]:
+        """Catalog entry an answer adds to questions, or None if it adds nothing."""
+        question_id = answer.get('QuestionId') if answer else None
+        if not question_id:
+            return None
+        existing = questions.get(question_id)
+        if existing is not None and (partial or not existing.get(PARTIAL_KEY)):
+            return None
+        # Only catalog complete payloads; error fallbacks carry no choices
+        if not answer.get('Choices'):
+            return None
+
+        content = extract_static_content(answer)
+        if partial:
+            content[PARTIAL_KEY] = True
+        elif existing is not None:
+            # Saved reports were stripped against the stored fields, so
+            # those are kept as they are and only missing ones are added
+            content = dict(content, **{k: v for k, v in existing.items() if k != PARTIAL_KEY})
+        return content
+
+    def _load_version(self, lens_alias: str, lens_version: str) -> Dict[str, Dict[str, Any]]:
+        """Return a version's questions, reloading them when another process changed the file."""
+        key = (lens_alias, lens_version)
+        catalog_file = self._catalog_file(lens_alias, lens_version)
+        stat = self._stat(catalog_file)
+        with self._lock:
+            questions = self._versions.get(key)
+            if questions is not None and self._version_stats.get(key) == stat:
+                return questions
+
+            questions = self._read_file(catalog_file) or {}
+            self._versions[key] = questions
+            self._version_stats[key] = stat
+            return questions
+
+    @staticmethod
+    def _read_file(catalog_file: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Questions stored in a catalog file; {} if it does not exist, None if unreadable."""
+        if not os.path.exists(catalog_file):
+            return {}
+        try:
+            with open(catalog_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('questions', {})
+        except Exception as e:
+            print(f"Warning: Could not load lens catalog {catalog_file}: {e}")
+            return None
+
+    @staticmethod
+    def _stat(catalog_file: str):
+        try:
+            stat = os.stat(catalog_file)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    @contextmanager
+    def _locked_catalog(self):
+        """Hold the catalog file lock across processes where supported."""
+        lock_file = None
+        try:
+            if fcntl is not None:
+                lock_file = open(os.path.join(self.data_dir, ".catalog.lock"), 'a')
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+        finally:
+            if lock_file is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+
+    def _persist_locked(self, lens_alias: str, lens_version: str, questions: Dict[str, Dict[str, Any]]) -> bool:
+        catalog_file = self._catalog_file(lens_alias, lens_version)
+        temp_file = f"{catalog_file}.{os.getpid()}.tmp"
+
+        try:
+            os.makedirs(os.path.dirname(catalog_file), exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "lens_alias": lens_alias,
+                    "lens_version": lens_version,
+                    "questions": questions
+                }, f, default=str)
+            # Atomic replace so concurrent workers never read a partial file
+            os.replace(temp_file, catalog_file)
+            return True
+        except Exception as e:
+            print(f"Warning: Could not persist lens catalog {catalog_file}: {e}")
+            return False
+
+    def _catalog_file(self, lens_alias: str, lens_version: str) -> str:
+        safe_alias = lens_alias.replace('/', '_').replace(':', '_')
+        safe_version = lens_version.replace('/', '_').replace(':', '_')
+        return os.path.join(self.data_dir, safe_alias, f"{safe_version}.json")
+
+
+def extract_static_content(answer: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the lens-static fields of a GetAnswer payload."""
+    return {field: answer[field] for field in STATIC_QUESTION_FIELDS if field in answer}
@@ -12,38 +12,48 @@ Features:
 - Report comparison
 - Data persistence
 - Metadata management
+- Pluggable storage backends (JSON files or SQLite, see report_storage.py)
+- Compressed, content-addressed report payloads shared by identical snapshots
+- Question and choice text stored once in the lens catalog, not per report
+- Byte-bounded in-process cache of parsed reports
+- Pillar questions loaded from their own shard only when accessed
+- Merkle hashes per pillar and report for change detection
 
 Author: Mohamed Toraif
 License: MIT
 """
 
-import json
 import os
 import uuid
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any
-import hashlib
+
+from report_storage import LazyPillar, ReportStorageBackend, content_hash, create_report_backend, report_size
+from wa_cache import ByteBoundedLRUCache
+
+# Budget for parsed reports kept in memory, in MiB of their JSON size - override via environment
+REPORT_CACHE_MAX_MB = int(os.environ.get('REPORT_CACHE_MAX_MB', '64'))
+
+# GetWorkload fields that change without any answer changing; kept in the metadata
+VOLATILE_WORKLOAD_FIELDS = ('UpdatedAt',)
 
 class ReportManager:
     """Manages Well-Architected reports with versioning and comparison capabilities."""
     
-    def __init__(self, data_dir: str = "/app/data/reports"):
-        """Initialize the report manager with data directory."""
+    def __init__(self, data_dir: str = "/app/data/reports", backend: Optional[ReportStorageBackend] = None,
+                 lens_catalog=None):
+        """Initialize the report manager with data directory, storage backend and lens catalog."""
         self.data_dir = data_dir
-        self.ensure_data_directory()
-    
-    def ensure_data_directory(self):
-        """Ensure the reports data directory exists."""
-        try:
-            os.makedirs(self.data_dir, exist_ok=True)
-            # Create subdirectories for organization
-            os.makedirs(os.path.join(self.data_dir, "workloads"), exist_ok=True)
-            os.makedirs(os.path.join(self.data_dir, "metadata"), exist_ok=True)
-        except Exception as e:
-            print(f"Warning: Could not create reports directory: {e}")
+        self.backend = backend or create_report_backend(data_dir)
+        self.lens_catalog = lens_catalog
+        # Saved reports are immutable, so cached entries only go away on delete or eviction.
+        # The cache lives in this process only: a report deleted through another worker
+        # stays cached here until it is evicted.
+        self.report_cache = ByteBoundedLRUCache(max_bytes=REPORT_CACHE_MAX_MB * 1024 * 1024)
     
     def save_report(self, workload_id: str, workload_name: str, report_data: Dict[str, Any], 
-                   user_notes: str = "", custom_name: str = "") -> str:
+                   user_notes: str = "", custom_name: str = "", lens_version: str = "",
+                   lens_alias: str = "wellarchitected") -> str:
         """
         Save a Well-Architected report with metadata.
         
@@ -53,48 +63,40 @@ class ReportManager:
             report_data: Complete report data including answers, risks, etc.
             user_notes: Optional user notes about this report
             custom_name: Optional custom name for the report
-            
+            lens_version: Lens version of the answers; when set, static question
+                content is stored in the lens catalog instead of the report
+            lens_alias: Lens the answers belong to
+        
         Returns:
             report_id: Unique identifier for the saved report
         """
         # Generate unique report ID
         report_id = str(uuid.uuid4())
         timestamp = datetime.now(timezone.utc)
+        report_data, volatile = self._split_volatile_fields(report_data)
+        # One hash serves as the change-detection data_hash and the blob address;
+        # without volatile fields identical snapshots share one blob
+        blob_hash = content_hash(report_data)
         
-        # Create report metadata
+        # Create report metadata; the backend allocates the version
         metadata = {
             "report_id": report_id,
             "workload_id": workload_id,
             "workload_name": workload_name,
             "custom_name": custom_name or f"{workload_name} - {timestamp.strftime('%Y-%m-%d %H:%M')}",
             "created_at": timestamp.isoformat(),
+            **volatile,
             "user_notes": user_notes,
-            "version": self._get_next_version(workload_id),
-            "data_hash": self._calculate_data_hash(report_data),
+            "data_hash": blob_hash[:16],
+            "blob_hash": blob_hash,
+            "merkle_hashes": self._calculate_merkle_hashes(report_data),
             "summary": self._generate_summary(report_data)
         }
         
-        # Save report data
-        report_file = os.path.join(self.data_dir, "workloads", f"{report_id}.json")
-        metadata_file = os.path.join(self.data_dir, "metadata", f"{report_id}_meta.json")
-        
         try:
-            # Save main report data
-            with open(report_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    "metadata": metadata,
-                    "report_data": report_data
-                }, f, indent=2, default=str)
-            
-            # Save metadata separately for quick access
-            with open(metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, indent=2, default=str)
-            
-            # Update workload index
-            self._update_workload_index(workload_id, metadata)
-            
+            self.backend.save_report(metadata, self._normalize_report_data(report_data, lens_alias, lens_version))
             return report_id
-            
+        
         except Exception as e:
             raise Exception(f"Failed to save report: {str(e)}")
     
@@ -104,34 +106,16 @@ class ReportManager:
         
         Args:
             workload_id: Optional workload ID to filter by
-            
+        
         Returns:
             List of report metadata dictionaries
         """
-        reports = []
-        metadata_dir = os.path.join(self.data_dir, "metadata")
-        
-        if not os.path.exists(metadata_dir):
-            return reports
-        
         try:
-            for filename in os.listdir(metadata_dir):
-                if filename.endswith("_meta.json"):
-                    filepath = os.path.join(metadata_dir, filename)
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-                        
-                    # Filter by workload if specified
-                    if workload_id is None or metadata.get('workload_id') == workload_id:
-                        reports.append(metadata)
-            
-            # Sort by creation date (newest first)
-            reports.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-            
+            # Sorted by creation date (newest first)
+            return self.backend.list_reports(workload_id)
         except Exception as e:
             print(f"Error loading saved reports: {e}")
-        
-        return reports
+            return []
     
     def get_report(self, report_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -139,18 +123,26 @@ class ReportManager:
         
         Args:
             report_id: Unique report identifier
-            
+        
         Returns:
-            Complete report data or None if not found
+            Complete report data or None if not found. Sharded pillars are
+            LazyPillar mappings that read their questions on first access. The
+            result may be shared with other requests through the report cache;
+            treat it as read-only. The cache is per process, so a report
+            deleted through another worker can still be returned here until
+            its cache entry is evicted.
         """
-        report_file = os.path.join(self.data_dir, "workloads", f"{report_id}.json")
-        
-        if not os.path.exists(report_file):
-            return None
+        report = self.report_cache.get(report_id)
+        if report is not None:
+            return report
         
         try:
-            with open(report_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            report = self.backend.get_report(report_id)
+            if report:
+                report["report_data"] = self._denormalize_report_data(report["report_data"])
+                # JSON length approximates the memory held once every pillar is loaded
+                self.report_cache.set(report_id, report, report_size(report))
+            return report
         except Exception as e:
             print(f"Error loading report {report_id}: {e}")
             return None
@@ -161,22 +153,13 @@ class ReportManager:
         
         Args:
             report_id: Unique report identifier
-            
+        
         Returns:
             True if deleted successfully, False otherwise
         """
-        report_file = os.path.join(self.data_dir, "workloads", f"{report_id}.json")
-        metadata_file = os.path.join(self.data_dir, "metadata", f"{report_id}_meta.json")
-        
+        self.report_cache.invalidate(report_id)
         try:
-            # Remove files if they exist
-            if os.path.exists(report_file):
-                os.remove(report_file)
-            if os.path.exists(metadata_file):
-                os.remove(metadata_file)
-            
-            return True
-            
+            return self.backend.delete_report(report_id)
         except Exception as e:
             print(f"Error deleting report {report_id}: {e}")
             return False
@@ -188,7 +171,7 @@ class ReportManager:
         Args:
             report_id1: First report ID
             report_id2: Second report ID
-            
+        
         Returns:
             Comparison results with differences highlighted
         """
@@ -213,20 +196,42 @@ class ReportManager:
             },
             "differences": self._compare_report_data(
                 report1["report_data"], 
-                report2["report_data"]
+                report2["report_data"],
+                report1["metadata"].get("merkle_hashes"),
+                report2["metadata"].get("merkle_hashes")
             ),
             "summary": self._generate_comparison_summary(report1, report2)
         }
         
         return comparison
     
+    def has_changes_since_last_report(self, workload_id: str, report_data: Dict[str, Any]) -> bool:
+        """
+        Check whether report data differs from the latest saved report of a workload.
+        
+        Only the Merkle root in the saved metadata is compared; no report body
+        is loaded.
+        
+        Args:
+            workload_id: AWS workload ID
+            report_data: Report data about to be saved
+        
+        Returns:
+            True if any pillar changed, or there is no earlier report to compare with
+        """
+        versions = self.get_workload_versions(workload_id)
+        if not versions:
+            return True
+        latest_hashes = versions[-1].get('merkle_hashes')
+        return not latest_hashes or latest_hashes.get('root') != self._calculate_merkle_hashes(report_data)['root']
+    
     def get_workload_versions(self, workload_id: str) -> List[Dict[str, Any]]:
         """
         Get all report versions for a specific workload.
         
         Args:
             workload_id: AWS workload ID
-            
+        
         Returns:
             List of report versions sorted by version number
         """
@@ -237,20 +242,116 @@ class ReportManager:
         
         return reports
     
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss/eviction counters of the parsed report cache."""
+        return self.report_cache.stats()
+    
     def _get_next_version(self, workload_id: str) -> int:
         """Get the next version number for a workload."""
-        existing_reports = self.get_saved_reports(workload_id)
-        if not existing_reports:
-            return 1
+        return self.backend.next_version(workload_id)
+    
+    def rebuild_index(self):
+        """Rebuild the report index from the metadata files, e.g. after restoring a backup."""
+        if hasattr(self.backend, 'rebuild_index'):
+            self.backend.rebuild_index()
+    
+    def _normalize_report_data(self, report_data: Dict[str, Any], lens_alias: str, lens_version: str) -> Dict[str, Any]:
+        """Replace lens-static question content with a reference to the lens catalog."""
+        pillars = report_data.get('pillars')
+        if self.lens_catalog is None or not lens_version or not isinstance(pillars, dict):
+            return report_data
+        
+        questions = [
+            question
+            for pillar_data in pillars.values() if isinstance(pillar_data, dict)
+            for question in pillar_data.get('questions', []) if isinstance(question, dict)
+        ]
+        # Summary-only questions are catalogued too, as partial entries
+        self.lens_catalog.add_answers(lens_alias, lens_version, questions, partial=True)
+        
+        normalized = {}
+        for pillar_id, pillar_data in pillars.items():
+            if isinstance(pillar_data, dict) and 'questions' in pillar_data:
+                pillar_data = dict(pillar_data, questions=[
+                    self.lens_catalog.strip_static(lens_alias, lens_version, question) if isinstance(question, dict) else question
+                    for question in pillar_data['questions']
+                ])
+            normalized[pillar_id] = pillar_data
+        
+        return dict(report_data, pillars=normalized, _lens={"alias": lens_alias, "version": lens_version})
+    
+    def _denormalize_report_data(self, report_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Join stored answer state with the lens catalog's question content."""
+        lens = report_data.get('_lens')
+        if not lens:
+            return report_data
+        
+        report_data = {key: value for key, value in report_data.items() if key != '_lens'}
+        if self.lens_catalog is None:
+            print("Warning: Report references the lens catalog, but no catalog is configured")
+            return report_data
+        
+        def restore(questions):
+            return [
+                self.lens_catalog.restore_static(lens['alias'], lens['version'], question) if isinstance(question, dict) else question
+                for question in questions
+            ]
         
-        max_version = max(report.get('version', 0) for report in existing_reports)
-        return max_version + 1
+        for pillar_id, pillar_data in report_data.get('pillars', {}).items():
+            if isinstance(pillar_data, LazyPillar):
+                # Joined when the pillar's shard is loaded
+                report_data['pillars'][pillar_id] = pillar_data.map_questions(restore)
+            elif isinstance(pillar_data, dict) and 'questions' in pillar_data:
+                report_data['pillars'][pillar_id] = dict(pillar_data, questions=restore(pillar_data['questions']))
+        return report_data
+    
+    @staticmethod
+    def _split_volatile_fields(report_data: Dict[str, Any]):
+        """
+        Separate fields that change on every save from the stored report data.
+        
+        Returns:
+            (report data without them, metadata fields holding their values)
+        """
+        volatile = {}
+        report_data = dict(report_data)
+        generated_at = report_data.pop('generated_at', None)
+        if generated_at:
+            volatile["generated_at"] = generated_at
+        
+        workload = report_data.get('workload')
+        if isinstance(workload, dict) and any(field in workload for field in VOLATILE_WORKLOAD_FIELDS):
+            report_data['workload'] = {key: value for key, value in workload.items() if key not in VOLATILE_WORKLOAD_FIELDS}
+            updated_at = workload.get('UpdatedAt')
+            if updated_at:
+                volatile["workload_updated_at"] = updated_at.isoformat() if isinstance(updated_at, datetime) else str(updated_at)
+        return report_data, volatile
     
     def _calculate_data_hash(self, data: Dict[str, Any]) -> str:
         """Calculate hash of report data for change detection."""
-        # Create a stable string representation of the data
-        data_str = json.dumps(data, sort_keys=True, default=str)
-        return hashlib.sha256(data_str.encode()).hexdigest()[:16]
+        return content_hash(data)[:16]
+    
+    def _calculate_merkle_hashes(self, report_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Calculate hierarchical hashes of the pillars for change detection.
+        
+        A pillar hash covers the pillar's fields and the hashes of its questions,
+        and the root covers the pillar hashes. Report-level fields such as
+        generated_at change on every save and are left out of the tree.
+        Question hashes are not kept in the metadata; the storage backend keeps
+        them with the pillar shards (see LazyPillar.question_hashes).
+        """
+        pillars = {}
+        
+        for pillar_id, pillar_data in report_data.get('pillars', {}).items():
+            question_hashes = [content_hash(question) for question in pillar_data.get('questions', [])]
+            fields = {key: value for key, value in pillar_data.items() if key != 'questions'}
+            pillars[pillar_id] = {"hash": content_hash({"fields": fields, "questions": question_hashes})}
+        
+        return {
+            "root": content_hash({pillar_id: pillar["hash"] for pillar_id, pillar in pillars.items()}),
+            "pillars": pillars
+        }
     
     def _generate_summary(self, report_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate a summary of the report data."""
@@ -303,8 +404,16 @@ class ReportManager:
         
         return summary
     
-    def _compare_report_data(self, data1: Dict[str, Any], data2: Dict[str, Any]) -> Dict[str, Any]:
-        """Compare two report data structures and identify differences."""
+    def _compare_report_data(self, data1: Dict[str, Any], data2: Dict[str, Any],
+                             hashes1: Optional[Dict[str, Any]] = None,
+                             hashes2: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Compare two report data structures and identify differences.
+        
+        With the reports' Merkle hashes, identical pillars are skipped without
+        loading their questions. In the other pillars, questions whose stored
+        hashes match are not compared.
+        """
         differences = {
             "changed_answers": [],
             "risk_changes": [],
@@ -318,10 +427,24 @@ class ReportManager:
         pillars2 = data2.get('pillars', {})
         
         all_pillars = set(pillars1.keys()) | set(pillars2.keys())
+        pillar_hashes1 = (hashes1 or {}).get('pillars', {})
+        pillar_hashes2 = (hashes2 or {}).get('pillars', {})
         
         for pillar_id in all_pillars:
+            pillar_hash1 = pillar_hashes1.get(pillar_id, {})
+            pillar_hash2 = pillar_hashes2.get(pillar_id, {})
+            if pillar_hash1.get('hash') and pillar_hash1.get('hash') == pillar_hash2.get('hash'):
+                continue
+            
             pillar1 = pillars1.get(pillar_id, {})
             pillar2 = pillars2.get(pillar_id, {})
+            if 'questions' in pillar_hash1 and 'questions' in pillar_hash2:
+                # Metadata of reports saved before question hashes moved to the shards
+                question_hashes1 = pillar_hash1['questions']
+                question_hashes2 = pillar_hash2['questions']
+            else:
+                question_hashes1 = getattr(pillar1, 'question_hashes', {})
+                question_hashes2 = getattr(pillar2, 'question_hashes', {})
             
             # Use QuestionId instead of question_id
             questions1 = {q.get('QuestionId'): q for q in pillar1.get('questions', [])}
@@ -351,6 +474,9 @@ class ReportManager:
                         "title": q2.get('QuestionTitle', 'Unknown Question')
                     })
                 elif q1 and q2:
+                    if question_id in question_hashes1 and question_hashes1[question_id] == question_hashes2.get(question_id):
+                        continue
+                    
                     # Compare answers
                     choices1 = set(q1.get('SelectedChoices', []))
                     choices2 = set(q2.get('SelectedChoices', []))
@@ -400,36 +526,3 @@ class ReportManager:
             "overall_improvement": (summary1["high_risks"] + summary1["medium_risks"]) - 
                                  (summary2["high_risks"] + summary2["medium_risks"])
         }
-    
-    def _update_workload_index(self, workload_id: str, metadata: Dict[str, Any]):
-        """Update the workload index for quick lookups."""
-        index_file = os.path.join(self.data_dir, "workload_index.json")
-        
-        try:
-            # Load existing index
-            if os.path.exists(index_file):
-                with open(index_file, 'r', encoding='utf-8') as f:
-                    index = json.load(f)
-            else:
-                index = {}
-            
-            # Update index
-            if workload_id not in index:
-                index[workload_id] = []
-            
-            index[workload_id].append({
-                "report_id": metadata["report_id"],
-                "version": metadata["version"],
-                "created_at": metadata["created_at"],
-                "custom_name": metadata["custom_name"]
-            })
-            
-            # Sort by version
-            index[workload_id].sort(key=lambda x: x["version"])
-            
-            # Save updated index
-            with open(index_file, 'w', encoding='utf-8') as f:
-                json.dump(index, f, indent=2, default=str)
-                
-        except Exception as e:
-            print(f"Warning: Could not update workload index: {e}")
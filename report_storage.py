@@ -0,0 +1,1124 @@
+#!/usr/bin/env python3
+"""
+Report Storage Backends for TorWAR
+Author: Mohamed Toraif
+
+Pluggable persistence for saved Well-Architected reports. ReportManager keeps
+the report logic (summaries, hashing, comparison) and delegates storage to a
+backend.
+
+Backends:
+- FileReportBackend: metadata files plus a persistent index and report
+  payloads as blob files (the original layout, default)
+- SqliteReportBackend: a single SQLite database with indexed workload,
+  creation time and version columns and transactional saves and deletes
+
+Report payloads are stored gzip-compressed and addressed by the SHA-256 of
+their canonical JSON (the data_hash prefix). Saving a snapshot identical to an
+earlier one only adds metadata referencing the existing blob; a blob is removed
+when the last report referencing it is deleted.
+
+Each pillar's questions are stored in their own shard blob. A report's blob is
+a small manifest holding everything else (pillar names, stats, risk counts)
+and the hash of every pillar shard. Loading a report reads only the manifest;
+a pillar's shard is read when its questions are first accessed, so viewing or
+comparing one pillar does not parse the others.
+
+Consecutive versions of a workload usually differ in a handful of answers. An
+unchanged pillar shares its shard with the previous version, and a changed
+pillar is stored as an answer-level delta against the same pillar of the
+previous version. Every REPORT_DELTA_MAX_CHAIN versions a full shard is stored
+again, which bounds the work to reconstruct any pillar. A blob holds a
+reference on every blob it points to, so deleting an older report never breaks
+a later version.
+
+Select the backend with REPORT_STORAGE_BACKEND=file|sqlite. The first time
+the SQLite database is created, existing JSON reports in the data directory
+are imported. The import can also be run by hand:
+
+    python report_storage.py migrate --data-dir data/reports
+
+Saved reports keep their question text in the lens catalog (data/lens_catalog
+next to data/reports), which must be copied along with the reports or the
+SQLite database. migrate reports lens versions missing from the catalog.
+
+Reports saved as full JSON files before blobs were introduced are still read;
+convert them with:
+
+    python report_storage.py compact --data-dir data/reports
+
+Author: Mohamed Toraif
+License: MIT
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import Counter
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from lens_catalog import LensCatalog
+
+try:
+    import fcntl
+except ImportError:  # Windows: index writes are only serialized within the process
+    fcntl = None
+
+# Storage backend for saved reports - override via environment
+REPORT_STORAGE_BACKEND = os.environ.get('REPORT_STORAGE_BACKEND', 'file').lower()
+# SQLite database path; defaults to reports.db inside the reports data directory
+REPORT_SQLITE_PATH = os.environ.get('REPORT_SQLITE_PATH', '')
+
+# Deltas between full snapshots of a workload's report; 0 stores every version in full
+REPORT_DELTA_MAX_CHAIN = int(os.environ.get('REPORT_DELTA_MAX_CHAIN', '10'))
+
+# Format of workload_index.json; older files are rebuilt from the metadata directory
+INDEX_FORMAT_VERSION = 4
+
+# gzip level for report blobs; report JSON compresses nearly as well at 6 as at 9, much faster
+BLOB_COMPRESS_LEVEL = 6
+
+
+def content_hash(report_data: Dict[str, Any]) -> str:
+    """SHA-256 of the canonical (key-sorted) JSON of report data."""
+    data_str = json.dumps(report_data, sort_keys=True, default=str)
+    return hashlib.sha256(data_str.encode()).hexdigest()
+
+
+def encode_blob(report_data: Dict[str, Any]) -> bytes:
+    """Compress report data for storage."""
+    # Key order is kept as saved (pillar order on the report pages); only the hash sorts keys
+    payload = json.dumps(report_data, separators=(',', ':'), default=str).encode('utf-8')
+    return gzip.compress(payload, compresslevel=BLOB_COMPRESS_LEVEL, mtime=0)
+
+
+def decode_blob(blob: bytes) -> Dict[str, Any]:
+    """Decompress a stored blob (report data or a delta)."""
+    return json.loads(gzip.decompress(blob))
+
+
+# Key marking a blob as a delta against another blob
+DELTA_KEY = "_delta"
+
+# Key marking a blob as a report manifest referencing pillar shards
+MANIFEST_KEY = "_manifest"
+
+
+def question_delta(base_questions: List[Any], questions: List[Any]) -> Tuple[List[Any], int]:
+    """
+    Describe questions as changes against base_questions.
+    
+    Unchanged questions are stored as their QuestionId, everything else in full.
+    
+    Returns:
+        (delta entries, number of questions stored in full)
+    """
+    by_id = {q.get('QuestionId'): q for q in base_questions if isinstance(q, dict)}
+    entries = []
+    changed = 0
+    
+    for question in questions:
+        question_id = question.get('QuestionId') if isinstance(question, dict) else None
+        if isinstance(question_id, str) and by_id.get(question_id) == question:
+            entries.append(question_id)
+        else:
+            entries.append(question)
+            changed += 1
+    return entries, changed
+
+
+def apply_question_delta(base_questions: List[Any], entries: List[Any]) -> List[Any]:
+    """Rebuild questions from their base questions and question_delta entries."""
+    by_id = {q.get('QuestionId'): q for q in base_questions if isinstance(q, dict)}
+    return [by_id[entry] if isinstance(entry, str) else entry for entry in entries]
+
+
+def apply_delta(base: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild a blob from its base blob and delta."""
+    if delta.get('kind') == 'questions':
+        return {'questions': apply_question_delta(base.get('questions', []), delta['questions'])}
+    
+    # Whole-report deltas, written before reports were split into pillar shards
+    base_pillars = base.get('pillars') or {}
+    pillars = {}
+    
+    for pillar_id, pillar_delta in delta['pillars'].items():
+        base_pillar = base_pillars.get(pillar_id) or {}
+        questions = apply_question_delta(base_pillar.get('questions', []), pillar_delta['questions'])
+        pillar_set = pillar_delta['set']
+        pillars[pillar_id] = {
+            k: questions if k == 'questions' else pillar_set[k] if k in pillar_set else base_pillar[k]
+            for k in pillar_delta['keys']
+        }
+    
+    report_set = delta['set']
+    return {k: pillars if k == 'pillars' else report_set[k] if k in report_set else base[k] for k in delta['keys']}
+
+
+def resolve_blob(blob_hash: str, read_blob: Callable[[str], bytes]) -> Tuple[Dict[str, Any], int]:
+    """
+    Reconstruct a blob by following its delta chain to its full snapshot.
+    
+    Args:
+        blob_hash: Blob to reconstruct
+        read_blob: Returns the stored bytes of a blob
+    
+    Returns:
+        (blob data, chain depth)
+    """
+    deltas = []
+    data = decode_blob(read_blob(blob_hash))
+    while DELTA_KEY in data:
+        deltas.append(data[DELTA_KEY])
+        data = decode_blob(read_blob(deltas[-1]['base']))
+    
+    for delta in reversed(deltas):
+        data = apply_delta(data, delta)
+    return data, len(deltas)
+
+
+def blob_references(data: Dict[str, Any]) -> List[str]:
+    """Hashes of the blobs a decoded blob points to: a delta's base or a manifest's shards."""
+    if DELTA_KEY in data:
+        return [data[DELTA_KEY]['base']]
+    if MANIFEST_KEY in data:
+        return [shard['hash'] for shard in data[MANIFEST_KEY]['shards'].values()]
+    return []
+
+
+class LazyPillar(Mapping):
+    """
+    A pillar of a loaded report whose questions are read from their shard the
+    first time they are accessed. The other pillar fields come from the report
+    manifest. Compares equal to the plain dict of the pillar.
+    
+    question_hashes maps question IDs to hash prefixes of the stored questions,
+    so two reports' questions can be matched without comparing them field by field.
+    """
+    
+    def __init__(self, fields: Dict[str, Any], load_questions: Callable[[], List[Any]], shard_size: int = 0,
+                 question_hashes: Optional[Dict[str, str]] = None):
+        self._fields = fields
+        self._load_questions = load_questions
+        self._questions = None
+        self._lock = threading.Lock()
+        self.shard_size = shard_size
+        self.question_hashes = question_hashes or {}
+    
+    @property
+    def loaded(self) -> bool:
+        """True once the questions have been read."""
+        return self._questions is not None
+    
+    def map_questions(self, func: Callable[[List[Any]], List[Any]]) -> 'LazyPillar':
+        """Return a pillar whose questions are func applied to these, still loaded on first access."""
+        load_questions = self._load_questions
+        return LazyPillar(self._fields, lambda: func(load_questions()), self.shard_size, self.question_hashes)
+    
+    def _questions_list(self) -> List[Any]:
+        if self._questions is None:
+            with self._lock:
+                if self._questions is None:
+                    self._questions = self._load_questions()
+        return self._questions
+    
+    def __getitem__(self, key):
+        if key == 'questions' and key in self._fields:
+            return self._questions_list()
+        return self._fields[key]
+    
+    def __iter__(self):
+        return iter(self._fields)
+    
+    def __len__(self):
+        return len(self._fields)
+    
+    def __repr__(self):
+        return f"LazyPillar({self._fields!r}, loaded={self.loaded})"
+
+
+def materialize(report_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Return report data with every lazy pillar loaded into a plain dict."""
+    pillars = report_data.get('pillars')
+    if not isinstance(pillars, dict) or not any(isinstance(p, LazyPillar) for p in pillars.values()):
+        return report_data
+    return dict(report_data, pillars={
+        pillar_id: dict(pillar) if isinstance(pillar, LazyPillar) else pillar for pillar_id, pillar in pillars.items()
+    })
+
+
+def report_size(report: Dict[str, Any]) -> int:
+    """Approximate JSON size of a loaded report, counting lazy pillars as fully loaded."""
+    lazy_pillars = []
+    
+    def pillar_fields(value):
+        if isinstance(value, LazyPillar):
+            lazy_pillars.append(value)
+            return value._fields
+        return str(value)
+    
+    size = len(json.dumps(report, separators=(',', ':'), default=pillar_fields))
+    return size + sum(pillar.shard_size for pillar in lazy_pillars)
+
+
+class ReportStorageBackend:
+    """
+    Interface of report storage backends.
+    
+    Reports are returned as {"metadata": {...}, "report_data": {...}}. Metadata
+    always carries report_id, workload_id, created_at and version, and
+    blob_hash (the content_hash of report_data) for content-addressed reports.
+    """
+    
+    def save_report(self, metadata: Dict[str, Any], report_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Store a new report, allocating its version number atomically.
+        
+        Args:
+            metadata: Report metadata without 'version', with 'blob_hash' if
+                the caller already computed the content hash
+            report_data: Complete report data
+        
+        Returns:
+            The stored metadata including the allocated version
+        """
+        raise NotImplementedError
+    
+    def list_reports(self, workload_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return report metadata, newest first, optionally for one workload."""
+        raise NotImplementedError
+    
+    def get_report(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """Return a stored report with its metadata, or None if not found."""
+        raise NotImplementedError
+    
+    def delete_report(self, report_id: str) -> bool:
+        """Delete a report; returns True if it no longer exists."""
+        raise NotImplementedError
+    
+    def next_version(self, workload_id: str) -> int:
+        """Return the version number the next report of a workload will get."""
+        raise NotImplementedError
+    
+    def encode_report(self, blob_hash: str, report_data: Dict[str, Any],
+                      previous_hash: Optional[str]) -> List[Tuple[str, bytes, List[str]]]:
+        """
+        Encode new report data as pillar shards and a manifest.
+        
+        Shards already stored are referenced rather than encoded again. A changed
+        pillar becomes a delta against the same pillar of previous_hash while
+        the delta chain allows it.
+        
+        Args:
+            blob_hash: content_hash of report_data, the manifest's address
+            report_data: Complete report data
+            previous_hash: Blob of the workload's previous version, if any
+        
+        Returns:
+            (hash, blob bytes, referenced hashes) of every blob to store, shards
+            before the manifest that references them
+        """
+        pillars = report_data.get('pillars')
+        if not isinstance(pillars, Mapping) or not all(isinstance(p, Mapping) for p in pillars.values()):
+            return [(blob_hash, encode_blob(report_data), [])]
+        
+        previous_shards = self._manifest_shards(previous_hash)
+        blobs = []
+        encoded = set()
+        skeleton = {}
+        shards = {}
+        
+        for pillar_id, pillar in pillars.items():
+            questions = pillar.get('questions')
+            if not isinstance(questions, list):
+                skeleton[pillar_id] = dict(pillar)
+                continue
+            
+            shard_hash = content_hash({'questions': questions})
+            shards[pillar_id] = {
+                'hash': shard_hash,
+                'size': len(json.dumps(questions, separators=(',', ':'), default=str)),
+                # Kept here rather than in the metadata index, which every listing reads
+                'questions': {
+                    question['QuestionId']: content_hash(question)[:16]
+                    for question in questions
+                    if isinstance(question, dict) and isinstance(question.get('QuestionId'), str)
+                }
+            }
+            skeleton[pillar_id] = dict(pillar, questions=None)
+            
+            # Unchanged pillars share the shard of an earlier version
+            if shard_hash in encoded or self.has_blob(shard_hash):
+                continue
+            encoded.add(shard_hash)
+            blob, base_hash = self.encode_shard(questions, previous_shards.get(pillar_id))
+            blobs.append((shard_hash, blob, [base_hash] if base_hash else []))
+        
+        manifest = {MANIFEST_KEY: {'report': dict(report_data, pillars=skeleton), 'shards': shards}}
+        blobs.append((blob_hash, encode_blob(manifest), [shard['hash'] for shard in shards.values()]))
+        return blobs
+    
+    def encode_shard(self, questions: List[Any], base_hash: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """
+        Encode a pillar shard, as a delta against base_hash while the chain allows it.
+        
+        Returns:
+            (blob bytes, base hash or None for a full shard)
+        """
+        if base_hash and REPORT_DELTA_MAX_CHAIN > 0:
+            try:
+                base, depth = resolve_blob(base_hash, self.read_blob)
+            except Exception as e:
+                print(f"Warning: Could not load base shard {base_hash}, storing a full shard: {e}")
+                base, depth = None, REPORT_DELTA_MAX_CHAIN
+            
+            if depth < REPORT_DELTA_MAX_CHAIN and questions:
+                entries, changed = question_delta(base.get('questions', []), questions)
+                # A mostly rewritten pillar is better stored as a new full shard
+                if changed * 2 <= len(questions):
+                    return encode_blob({DELTA_KEY: {'kind': 'questions', 'base': base_hash, 'questions': entries}}), base_hash
+        
+        return encode_blob({'questions': questions}), None
+    
+    def load_report_data(self, blob_hash: str) -> Dict[str, Any]:
+        """Load report data, with the questions of sharded pillars loaded on first access."""
+        data = resolve_blob(blob_hash, self.read_blob)[0]
+        manifest = data.get(MANIFEST_KEY)
+        if manifest is None:
+            # Stored whole, before reports were split into pillar shards
+            return data
+        
+        report = manifest['report']
+        shards = manifest['shards']
+        pillars = {}
+        for pillar_id, pillar in report['pillars'].items():
+            shard = shards.get(pillar_id)
+            pillars[pillar_id] = LazyPillar(
+                pillar, self._shard_loader(shard['hash']), shard['size'], shard.get('questions')
+            ) if shard else pillar
+        return dict(report, pillars=pillars)
+    
+    def has_blob(self, blob_hash: str) -> bool:
+        """Return True if a blob is stored."""
+        raise NotImplementedError
+    
+    def read_blob(self, blob_hash: str) -> bytes:
+        """Return the stored bytes of a blob."""
+        raise NotImplementedError
+    
+    def iter_reports(self) -> Iterator[Dict[str, Any]]:
+        """Yield every stored report, fully loaded, e.g. for migration between backends."""
+        for metadata in self.list_reports():
+            report = self.get_report(metadata['report_id'])
+            if report:
+                report["report_data"] = materialize(report["report_data"])
+                yield report
+    
+    def _shard_loader(self, shard_hash: str) -> Callable[[], List[Any]]:
+        return lambda: resolve_blob(shard_hash, self.read_blob)[0]['questions']
+    
+    def _manifest_shards(self, blob_hash: Optional[str]) -> Dict[str, str]:
+        """Pillar shard hashes of a stored report; empty for reports stored whole."""
+        if not blob_hash:
+            return {}
+        try:
+            manifest = decode_blob(self.read_blob(blob_hash)).get(MANIFEST_KEY)
+        except Exception as e:
+            print(f"Warning: Could not load report blob {blob_hash}: {e}")
+            return {}
+        return {pillar_id: shard['hash'] for pillar_id, shard in manifest['shards'].items()} if manifest else {}
+
+
+class FileReportBackend(ReportStorageBackend):
+    """
+    Original file layout: metadata/<id>_meta.json, workload_index.json and
+    blobs/<hash[:2]>/<hash>.json.gz. Reports saved before blobs existed live in
+    workloads/<id>.json until compacted.
+    
+    The index also maps every blob to the blobs it references (a manifest's
+    pillar shards, a shard delta's base), from which the blob reference counts
+    are derived.
+    
+    workload_index.json holds the metadata of every saved report and the next
+    version per workload. It is loaded once and kept in memory. Another process
+    writing the file changes its mtime, which makes this process reload it on
+    its next access.
+    """
+    
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self._index_lock = threading.RLock()
+        self._index = None
+        self._index_stat = None
+        self._workload_reports = {}
+        self._blob_refs = Counter()
+        self.ensure_data_directory()
+    
+    def ensure_data_directory(self):
+        """Ensure the reports data directory exists."""
+        try:
+            os.makedirs(self.data_dir, exist_ok=True)
+            # Create subdirectories for organization
+            os.makedirs(os.path.join(self.data_dir, "workloads"), exist_ok=True)
+            os.makedirs(os.path.join(self.data_dir, "metadata"), exist_ok=True)
+            os.makedirs(os.path.join(self.data_dir, "blobs"), exist_ok=True)
+        except Exception as e:
+            print(f"Warning: Could not create reports directory: {e}")
+    
+    def save_report(self, metadata: Dict[str, Any], report_data: Dict[str, Any]) -> Dict[str, Any]:
+        report_id = metadata["report_id"]
+        metadata_file = os.path.join(self.data_dir, "metadata", f"{report_id}_meta.json")
+        blob_hash = metadata.get("blob_hash") or content_hash(report_data)
+        
+        # Version allocation and the index update happen under one index lock
+        with self._locked_index() as index:
+            workload_id = metadata["workload_id"]
+            metadata = dict(metadata, version=index["next_versions"].get(workload_id, 1), blob_hash=blob_hash)
+            
+            # Identical snapshots share one blob; new content is sharded against the previous version
+            if blob_hash not in index["blobs"]:
+                self._store_blobs(index, self.encode_report(blob_hash, report_data, self._latest_blob(index, workload_id)))
+            
+            # Save metadata separately for quick access
+            with open(metadata_file, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, indent=2, default=str)
+            
+            self._add_to_index(index, metadata)
+        
+        return metadata
+    
+    def list_reports(self, workload_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._index_lock:
+            index = self._current_index()
+            if workload_id is None:
+                report_ids = index["reports"].keys()
+            else:
+                report_ids = self._workload_reports.get(workload_id, ())
+            # Copies, so callers cannot modify the index
+            reports = [dict(index["reports"][report_id]) for report_id in report_ids]
+        
+        reports.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+        return reports
+    
+    def get_report(self, report_id: str) -> Optional[Dict[str, Any]]:
+        with self._index_lock:
+            metadata = self._current_index()["reports"].get(report_id)
+            metadata = dict(metadata) if metadata else None
+        
+        if metadata and metadata.get("blob_hash"):
+            try:
+                return {"metadata": metadata, "report_data": self.load_report_data(metadata["blob_hash"])}
+            except Exception as e:
+                print(f"Error loading report {report_id}: {e}")
+                return None
+        
+        # Reports saved before content-addressed blobs
+        report_file = os.path.join(self.data_dir, "workloads", f"{report_id}.json")
+        
+        if not os.path.exists(report_file):
+            return None
+        
+        try:
+            with open(report_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading report {report_id}: {e}")
+            return None
+    
+    def delete_report(self, report_id: str) -> bool:
+        report_file = os.path.join(self.data_dir, "workloads", f"{report_id}.json")
+        metadata_file = os.path.join(self.data_dir, "metadata", f"{report_id}_meta.json")
+        
+        with self._locked_index() as index:
+            # Remove files if they exist
+            if os.path.exists(report_file):
+                os.remove(report_file)
+            if os.path.exists(metadata_file):
+                os.remove(metadata_file)
+            
+            metadata = index["reports"].pop(report_id, None)
+            if metadata is not None:
+                self._workload_reports.get(metadata.get('workload_id'), set()).discard(report_id)
+                released = self._release_blob(index, metadata.get("blob_hash"))
+                self._write_index(index)
+                
+                # Drop blobs only after the index no longer references them
+                for blob_hash in released:
+                    blob_file = self._blob_file(blob_hash)
+                    if os.path.exists(blob_file):
+                        os.remove(blob_file)
+        
+        return True
+    
+    def next_version(self, workload_id: str) -> int:
+        with self._index_lock:
+            return self._current_index()["next_versions"].get(workload_id, 1)
+    
+    def has_reports(self) -> bool:
+        """Return True if any report metadata exists on disk."""
+        metadata_dir = os.path.join(self.data_dir, "metadata")
+        return os.path.isdir(metadata_dir) and any(name.endswith("_meta.json") for name in os.listdir(metadata_dir))
+    
+    def rebuild_index(self):
+        """Rebuild the report index from the metadata files, e.g. after restoring a backup."""
+        with self._locked_index(rebuild=True):
+            pass
+    
+    def compact(self) -> int:
+        """
+        Move reports saved as full JSON files into content-addressed blobs.
+        
+        Returns:
+            Number of reports converted
+        """
+        converted = []
+        
+        with self._locked_index() as index:
+            for report_id, metadata in index["reports"].items():
+                if metadata.get("blob_hash"):
+                    continue
+                report = self.get_report(report_id)
+                if not report:
+                    continue
+                
+                blob_hash = content_hash(report["report_data"])
+                if blob_hash not in index["blobs"]:
+                    self._store_blobs(index, self.encode_report(blob_hash, report["report_data"], None))
+                metadata["blob_hash"] = blob_hash
+                self._blob_refs[blob_hash] += 1
+                with open(os.path.join(self.data_dir, "metadata", f"{report_id}_meta.json"), 'w', encoding='utf-8') as f:
+                    json.dump(metadata, f, indent=2, default=str)
+                converted.append(report_id)
+            
+            if converted:
+                self._write_index(index)
+                # Old files go only once the index points at the blobs
+                for report_id in converted:
+                    os.remove(os.path.join(self.data_dir, "workloads", f"{report_id}.json"))
+        
+        return len(converted)
+    
+    def has_blob(self, blob_hash: str) -> bool:
+        with self._index_lock:
+            return blob_hash in self._current_index()["blobs"]
+    
+    def read_blob(self, blob_hash: str) -> bytes:
+        with open(self._blob_file(blob_hash), 'rb') as f:
+            return f.read()
+    
+    def _latest_blob(self, index: Dict[str, Any], workload_id: str) -> Optional[str]:
+        """Blob of the newest version of a workload, the base for the next delta."""
+        reports = (index["reports"][report_id] for report_id in self._workload_reports.get(workload_id, ()))
+        latest = max(reports, key=lambda m: m.get("version", 0), default=None)
+        return latest.get("blob_hash") if latest else None
+    
+    def _store_blobs(self, index: Dict[str, Any], blobs: List[Tuple[str, bytes, List[str]]]):
+        """Write encode_report blobs and count their references to other blobs."""
+        for blob_hash, blob, references in blobs:
+            self._write_blob(blob_hash, blob)
+            index["blobs"][blob_hash] = references
+            self._blob_refs.update(references)
+    
+    def _release_blob(self, index: Dict[str, Any], blob_hash: Optional[str]) -> List[str]:
+        """Drop one reference to a blob; returns the blobs (it and those it references) no longer used."""
+        released = []
+        pending = [blob_hash] if blob_hash else []
+        while pending:
+            blob_hash = pending.pop()
+            self._blob_refs[blob_hash] -= 1
+            if self._blob_refs[blob_hash] > 0:
+                continue
+            del self._blob_refs[blob_hash]
+            released.append(blob_hash)
+            pending.extend(index["blobs"].pop(blob_hash, None) or [])
+        return released
+    
+    def _add_to_index(self, index: Dict[str, Any], metadata: Dict[str, Any]):
+        """Add a saved report to the index and persist it."""
+        workload_id = metadata["workload_id"]
+        index["reports"][metadata["report_id"]] = metadata
+        index["next_versions"][workload_id] = max(index["next_versions"].get(workload_id, 1), metadata["version"] + 1)
+        self._workload_reports.setdefault(workload_id, set()).add(metadata["report_id"])
+        self._blob_refs[metadata["blob_hash"]] += 1
+        
+        try:
+            self._write_index(index)
+        except Exception as e:
+            print(f"Warning: Could not update workload index: {e}")
+    
+    def _index_file(self) -> str:
+        return os.path.join(self.data_dir, "workload_index.json")
+    
+    def _stat_index(self):
+        try:
+            stat = os.stat(self._index_file())
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+    
+    def _current_index(self) -> Dict[str, Any]:
+        """Return the in-memory index, reloading it if another process changed the file."""
+        if self._index is None or self._stat_index() != self._index_stat:
+            self._load_index()
+        return self._index
+    
+    @contextmanager
+    def _locked_index(self, rebuild: bool = False):
+        """Hold the index lock (across processes where supported) and yield a current index."""
+        with self._index_lock:
+            lock_file = None
+            try:
+                if fcntl is not None:
+                    lock_file = open(os.path.join(self.data_dir, ".index.lock"), 'a')
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                
+                if rebuild:
+                    self._rebuild_index()
+                yield self._current_index()
+            finally:
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
+    
+    def _load_index(self):
+        index = None
+        stat = self._stat_index()
+        
+        if stat is not None:
+            try:
+                with open(self._index_file(), 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+            except Exception as e:
+                print(f"Warning: Could not load report index, rebuilding: {e}")
+        
+        if not isinstance(index, dict) or index.get("format") != INDEX_FORMAT_VERSION:
+            # Missing, unreadable or the old list-per-workload index
+            self._rebuild_index()
+            return
+        
+        self._set_index(index, stat)
+    
+    def _rebuild_index(self):
+        """Build the index by scanning the metadata directory once."""
+        index = {"format": INDEX_FORMAT_VERSION, "generation": 0, "reports": {}, "next_versions": {}, "blobs": {}}
+        metadata_dir = os.path.join(self.data_dir, "metadata")
+        
+        if os.path.exists(metadata_dir):
+            for filename in os.listdir(metadata_dir):
+                if not filename.endswith("_meta.json"):
+                    continue
+                try:
+                    with open(os.path.join(metadata_dir, filename), 'r', encoding='utf-8') as f:
+                        metadata = json.load(f)
+                except Exception as e:
+                    print(f"Warning: Skipping unreadable report metadata {filename}: {e}")
+                    continue
+                
+                report_id = metadata.get("report_id") or filename[:-len("_meta.json")]
+                index["reports"][report_id] = metadata
+                workload_id = metadata.get("workload_id")
+                next_version = metadata.get("version", 0) + 1
+                index["next_versions"][workload_id] = max(index["next_versions"].get(workload_id, 1), next_version)
+        
+        # Follow manifests and delta chains so shards and bases only referenced by other blobs are counted too
+        pending = [metadata["blob_hash"] for metadata in index["reports"].values() if metadata.get("blob_hash")]
+        while pending:
+            blob_hash = pending.pop()
+            if blob_hash in index["blobs"]:
+                continue
+            references = []
+            try:
+                references = blob_references(decode_blob(self.read_blob(blob_hash)))
+            except Exception as e:
+                print(f"Warning: Could not read report blob {blob_hash}: {e}")
+            index["blobs"][blob_hash] = references
+            pending.extend(references)
+        
+        if self._index is not None:
+            index["generation"] = self._index.get("generation", 0)
+        self._set_index(index, None)
+        
+        try:
+            self._write_index(index)
+        except Exception as e:
+            print(f"Warning: Could not write report index: {e}")
+    
+    def _set_index(self, index: Dict[str, Any], stat):
+        self._index = index
+        self._index_stat = stat
+        self._workload_reports = {}
+        self._blob_refs = Counter()
+        for report_id, metadata in index["reports"].items():
+            self._workload_reports.setdefault(metadata.get("workload_id"), set()).add(report_id)
+            if metadata.get("blob_hash"):
+                self._blob_refs[metadata["blob_hash"]] += 1
+        for references in index["blobs"].values():
+            self._blob_refs.update(references)
+    
+    def _write_index(self, index: Dict[str, Any]):
+        index["generation"] = index.get("generation", 0) + 1
+        index_file = self._index_file()
+        temp_file = f"{index_file}.{os.getpid()}.tmp"
+        
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f, default=str)
+        # Atomic replace so other workers never read a partial index
+        os.replace(temp_file, index_file)
+        self._index_stat = self._stat_index()
+    
+    def _blob_file(self, blob_hash: str) -> str:
+        return os.path.join(self.data_dir, "blobs", blob_hash[:2], f"{blob_hash}.json.gz")
+    
+    def _write_blob(self, blob_hash: str, blob: bytes):
+        blob_file = self._blob_file(blob_hash)
+        os.makedirs(os.path.dirname(blob_file), exist_ok=True)
+        temp_file = f"{blob_file}.{os.getpid()}.tmp"
+        
+        with open(temp_file, 'wb') as f:
+            f.write(blob)
+        os.replace(temp_file, blob_file)
+
+
+class SqliteReportBackend(ReportStorageBackend):
+    """
+    Reports in one SQLite database.
+    
+    Saves and deletes are single transactions, so concurrent gunicorn workers
+    cannot corrupt the store or allocate the same version twice. The database
+    runs in WAL mode so readers are not blocked by a writer.
+    
+    Report payloads live in the blobs table with a reference count that saves
+    and deletes maintain in the same transaction as the report row. blob_refs
+    records the blobs each blob references (a manifest's pillar shards, a shard
+    delta's base), each holding one reference.
+    """
+    
+    REPORTS_TABLE = """
+        CREATE TABLE IF NOT EXISTS reports (
+            report_id TEXT PRIMARY KEY,
+            workload_id TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            metadata TEXT NOT NULL,
+            blob_hash TEXT NOT NULL
+        )
+    """
+    
+    SCHEMA = REPORTS_TABLE + """;
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_reports_workload_version ON reports (workload_id, version);
+        CREATE INDEX IF NOT EXISTS idx_reports_created_at ON reports (created_at);
+        CREATE TABLE IF NOT EXISTS workload_versions (
+            workload_id TEXT PRIMARY KEY,
+            next_version INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS storage_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS blobs (
+            blob_hash TEXT PRIMARY KEY,
+            data BLOB NOT NULL,
+            refcount INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS blob_refs (
+            blob_hash TEXT NOT NULL,
+            ref_hash TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_blob_refs_blob ON blob_refs (blob_hash);
+    """
+    
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # executescript commits on its own; the schema statements are idempotent
+        self._connection().executescript(self.SCHEMA)
+        self._upgrade_schema()
+    
+    def save_report(self, metadata: Dict[str, Any], report_data: Dict[str, Any]) -> Dict[str, Any]:
+        blob_hash = metadata.get("blob_hash") or content_hash(report_data)
+        
+        # Encoding happens under the write lock, so shared shards and delta bases cannot be deleted meanwhile
+        with self._transaction() as conn:
+            metadata = dict(metadata, version=self._next_version(conn, metadata["workload_id"]), blob_hash=blob_hash)
+            latest = conn.execute(
+                "SELECT blob_hash FROM reports WHERE workload_id = ? ORDER BY version DESC LIMIT 1",
+                (metadata["workload_id"],)
+            ).fetchone()
+            self._insert(conn, metadata, report_data, latest[0] if latest else None)
+        return metadata
+    
+    def list_reports(self, workload_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        conn = self._connection()
+        if workload_id is None:
+            rows = conn.execute("SELECT metadata FROM reports ORDER BY created_at DESC").fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT metadata FROM reports WHERE workload_id = ? ORDER BY created_at DESC",
+                (workload_id,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+    
+    def get_report(self, report_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT metadata, blob_hash FROM reports WHERE report_id = ?", (report_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"metadata": json.loads(row[0]), "report_data": self.load_report_data(row[1])}
+    
+    def delete_report(self, report_id: str) -> bool:
+        with self._transaction() as conn:
+            row = conn.execute("SELECT blob_hash FROM reports WHERE report_id = ?", (report_id,)).fetchone()
+            if row:
+                conn.execute("DELETE FROM reports WHERE report_id = ?", (report_id,))
+                self._release_blob(conn, row[0])
+        return True
+    
+    def next_version(self, workload_id: str) -> int:
+        return self._next_version(self._connection(), workload_id)
+    
+    def import_report(self, metadata: Dict[str, Any], report_data: Dict[str, Any]) -> bool:
+        """
+        Import a report with its existing ID and version, e.g. during migration.
+        
+        Returns:
+            True if imported, False if a report with that ID already exists
+        """
+        with self._transaction() as conn:
+            exists = conn.execute(
+                "SELECT 1 FROM reports WHERE report_id = ?", (metadata["report_id"],)
+            ).fetchone()
+            if exists:
+                return False
+            self._insert(conn, metadata, report_data)
+        return True
+    
+    def get_meta(self, key: str) -> Optional[str]:
+        """Return a storage_meta value, or None."""
+        row = self._connection().execute("SELECT value FROM storage_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def set_meta(self, key: str, value: str):
+        """Set a storage_meta value."""
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO storage_meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+    
+    def has_blob(self, blob_hash: str) -> bool:
+        return self._connection().execute("SELECT 1 FROM blobs WHERE blob_hash = ?", (blob_hash,)).fetchone() is not None
+    
+    def read_blob(self, blob_hash: str) -> bytes:
+        row = self._connection().execute("SELECT data FROM blobs WHERE blob_hash = ?", (blob_hash,)).fetchone()
+        if row is None:
+            raise KeyError(f"Report blob {blob_hash} not found")
+        return row[0]
+    
+    def _insert(self, conn, metadata: Dict[str, Any], report_data: Dict[str, Any], previous_hash: Optional[str] = None):
+        if not metadata.get("blob_hash"):
+            metadata["blob_hash"] = content_hash(report_data)
+        
+        referenced = conn.execute(
+            "UPDATE blobs SET refcount = refcount + 1 WHERE blob_hash = ?", (metadata["blob_hash"],)
+        ).rowcount
+        if not referenced:
+            for blob_hash, blob, references in self.encode_report(metadata["blob_hash"], report_data, previous_hash):
+                # Only the report's own blob is referenced by the report row; shards by the manifest
+                conn.execute(
+                    "INSERT INTO blobs (blob_hash, data, refcount) VALUES (?, ?, ?)",
+                    (blob_hash, blob, 1 if blob_hash == metadata["blob_hash"] else 0)
+                )
+                for ref_hash in references:
+                    conn.execute("INSERT INTO blob_refs (blob_hash, ref_hash) VALUES (?, ?)", (blob_hash, ref_hash))
+                    conn.execute("UPDATE blobs SET refcount = refcount + 1 WHERE blob_hash = ?", (ref_hash,))
+        
+        conn.execute(
+            "INSERT INTO reports (report_id, workload_id, version, created_at, metadata, blob_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                metadata["report_id"],
+                metadata["workload_id"],
+                metadata["version"],
+                metadata["created_at"],
+                json.dumps(metadata, default=str),
+                metadata["blob_hash"]
+            )
+        )
+        conn.execute(
+            "INSERT INTO workload_versions (workload_id, next_version) VALUES (?, ?) "
+            "ON CONFLICT(workload_id) DO UPDATE SET next_version = MAX(next_version, excluded.next_version)",
+            (metadata["workload_id"], metadata["version"] + 1)
+        )
+    
+    @staticmethod
+    def _release_blob(conn, blob_hash: str):
+        """Drop one reference to a blob, deleting it and the blobs it references once unused."""
+        pending = [blob_hash]
+        while pending:
+            blob_hash = pending.pop()
+            conn.execute("UPDATE blobs SET refcount = refcount - 1 WHERE blob_hash = ?", (blob_hash,))
+            row = conn.execute("SELECT refcount FROM blobs WHERE blob_hash = ?", (blob_hash,)).fetchone()
+            if row is None or row[0] > 0:
+                continue
+            pending.extend(ref[0] for ref in conn.execute("SELECT ref_hash FROM blob_refs WHERE blob_hash = ?", (blob_hash,)))
+            conn.execute("DELETE FROM blob_refs WHERE blob_hash = ?", (blob_hash,))
+            conn.execute("DELETE FROM blobs WHERE blob_hash = ?", (blob_hash,))
+    
+    def _upgrade_schema(self):
+        """Upgrade databases created by earlier versions of this backend."""
+        blob_columns = [row[1] for row in self._connection().execute("PRAGMA table_info(blobs)")]
+        if "base_hash" in blob_columns:
+            # Whole-report deltas kept their base in a column; move those references to blob_refs
+            with self._transaction() as conn:
+                conn.execute("INSERT INTO blob_refs (blob_hash, ref_hash) "
+                             "SELECT blob_hash, base_hash FROM blobs WHERE base_hash IS NOT NULL")
+                conn.execute("UPDATE blobs SET base_hash = NULL WHERE base_hash IS NOT NULL")
+        
+        # Move report JSON stored per row (the first SQLite layout) into blobs
+        columns = [row[1] for row in self._connection().execute("PRAGMA table_info(reports)")]
+        if "report_data" not in columns:
+            return
+        
+        with self._transaction() as conn:
+            # The indexes follow the renamed table; drop them so the new table gets its own
+            conn.execute("DROP INDEX IF EXISTS idx_reports_workload_version")
+            conn.execute("DROP INDEX IF EXISTS idx_reports_created_at")
+            conn.execute("ALTER TABLE reports RENAME TO reports_legacy")
+            conn.execute(self.REPORTS_TABLE)
+            for metadata, report_data in conn.execute("SELECT metadata, report_data FROM reports_legacy").fetchall():
+                self._insert(conn, json.loads(metadata), json.loads(report_data))
+            conn.execute("DROP TABLE reports_legacy")
+        self._connection().executescript(self.SCHEMA)
+    
+    @staticmethod
+    def _next_version(conn, workload_id: str) -> int:
+        row = conn.execute(
+            "SELECT next_version FROM workload_versions WHERE workload_id = ?", (workload_id,)
+        ).fetchone()
+        return row[0] if row else 1
+    
+    def _connection(self):
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        # IMMEDIATE takes the write lock up front so version allocation cannot race
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def migrate_json_reports(source: FileReportBackend, target: SqliteReportBackend, lens_catalog=None) -> int:
+    """
+    Import every report of the JSON file tree into a SQLite backend.
+    
+    Report IDs and versions are kept; reports already in the target are
+    skipped, so the migration can be re-run safely.
+    
+    Args:
+        source: File backend to read
+        target: SQLite backend to import into
+        lens_catalog: LensCatalog the reports' question text is stored in; when
+            given, lens versions referenced but not catalogued are reported
+    
+    Returns:
+        Number of reports imported
+    """
+    imported = 0
+    lenses = set()
+    for report in source.iter_reports():
+        metadata = report.get("metadata") or {}
+        if not metadata.get("report_id"):
+            continue
+        lens = report.get("report_data", {}).get("_lens")
+        if lens:
+            lenses.add((lens.get("alias"), lens.get("version")))
+        try:
+            if target.import_report(metadata, report.get("report_data", {})):
+                imported += 1
+        except Exception as e:
+            print(f"Warning: Could not migrate report {metadata.get('report_id')}: {e}")
+    
+    if lens_catalog is not None:
+        for lens_alias, lens_version in sorted(lenses):
+            if not lens_catalog.has_version(lens_alias, lens_version):
+                print(f"Warning: Lens catalog {lens_catalog.data_dir} has no {lens_alias}/{lens_version}; "
+                      f"reports using it will lack question text until the catalog is copied there")
+    return imported
+
+
+def create_report_backend(data_dir: str, backend: str = REPORT_STORAGE_BACKEND) -> ReportStorageBackend:
+    """
+    Create the configured storage backend for a reports data directory.
+    
+    On first use of the SQLite backend, reports in the JSON file tree are
+    imported so switching backends keeps existing history.
+    """
+    if backend == 'sqlite':
+        sqlite_backend = SqliteReportBackend(REPORT_SQLITE_PATH or os.path.join(data_dir, "reports.db"))
+        if sqlite_backend.get_meta("json_migration") is None:
+            file_backend = FileReportBackend(data_dir)
+            imported = migrate_json_reports(file_backend, sqlite_backend) if file_backend.has_reports() else 0
+            sqlite_backend.set_meta("json_migration", str(imported))
+            if imported:
+                print(f"Imported {imported} saved reports into {sqlite_backend.db_path}")
+        return sqlite_backend
+    
+    if backend != 'file':
+        print(f"Warning: Unknown REPORT_STORAGE_BACKEND '{backend}', using file storage")
+    return FileReportBackend(data_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='TorWAR report storage maintenance.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    migrate = subparsers.add_parser('migrate', help='Import JSON reports into the SQLite backend')
+    migrate.add_argument('--data-dir', default='/app/data/reports', help='Reports data directory')
+    migrate.add_argument('--db', help='SQLite database path (default: <data-dir>/reports.db)')
+    migrate.add_argument('--lens-catalog-dir',
+                         help='Lens catalog the reports reference (default: lens_catalog next to <data-dir>)')
+    subparsers.add_parser('rebuild-index', help='Rebuild workload_index.json of the file backend').add_argument(
+        '--data-dir', default='/app/data/reports', help='Reports data directory'
+    )
+    subparsers.add_parser('compact', help='Convert full JSON report files of the file backend into blobs').add_argument(
+        '--data-dir', default='/app/data/reports', help='Reports data directory'
+    )
+    args = parser.parse_args(argv)
+    
+    if args.command == 'migrate':
+        target = SqliteReportBackend(args.db or os.path.join(args.data_dir, "reports.db"))
+        catalog_dir = args.lens_catalog_dir or os.path.join(os.path.dirname(os.path.abspath(args.data_dir)), "lens_catalog")
+        imported = migrate_json_reports(FileReportBackend(args.data_dir), target, LensCatalog(catalog_dir))
+        target.set_meta("json_migration", str(imported))
+        print(f"Imported {imported} reports into {target.db_path}")
+    elif args.command == 'rebuild-index':
+        FileReportBackend(args.data_dir).rebuild_index()
+        print("Report index rebuilt")
+    elif args.command == 'compact':
+        converted = FileReportBackend(args.data_dir).compact()
+        print(f"Converted {converted} reports to compressed blobs")
+
+
+if __name__ == '__main__':
+    main()
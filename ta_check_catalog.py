@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Trusted Advisor Check Catalog for TorWAR
+Author: Mohamed Toraif
+
+Disk-persisted copy of the Trusted Advisor check definitions (names,
+descriptions, categories and metadata schemas) per language. The definitions
+are the same for every account and only change when AWS adds or retires
+checks, so they are revalidated once a day instead of fetched per request.
+
+Author: Mohamed Toraif
+License: MIT
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Seconds before a persisted check catalog is fetched again
+CHECK_CATALOG_MAX_AGE = int(os.environ.get('TA_CHECK_CATALOG_MAX_AGE', '86400'))
+
+
+class TrustedAdvisorCheckCatalog:
+    """Trusted Advisor check definitions keyed by language, kept in memory and on disk."""
+    
+    def __init__(self, data_dir: str = "/app/data/ta_checks", max_age: float = CHECK_CATALOG_MAX_AGE):
+        """Initialize the catalog with its persistence directory and revalidation age."""
+        self.data_dir = data_dir
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._languages = {}
+        self.ensure_data_directory()
+    
+    def ensure_data_directory(self):
+        """Ensure the catalog data directory exists."""
+        try:
+            os.makedirs(self.data_dir, exist_ok=True)
+        except Exception as e:
+            print(f"Warning: Could not create Trusted Advisor check catalog directory: {e}")
+    
+    def get(self, language: str = 'en', allow_stale: bool = False) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get the catalogued checks for a language.
+        
+        Args:
+            language: Trusted Advisor language code
+            allow_stale: Also return a catalog older than max_age
+        
+        Returns:
+            List of check definitions, or None if missing or due for revalidation
+        """
+        entry = self._load(language)
+        if not entry:
+            return None
+        if not allow_stale and time.time() - entry['fetched_at'] >= self.max_age:
+            return None
+        return entry['checks']
+    
+    def store(self, language: str, checks: List[Dict[str, Any]]):
+        """Replace the catalog for a language and persist it."""
+        entry = {'language': language, 'fetched_at': time.time(), 'checks': checks}
+        with self._lock:
+            self._languages[language] = entry
+            self._persist_locked(entry)
+    
+    def _load(self, language: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if language in self._languages:
+                return self._languages[language]
+            
+            entry = None
+            catalog_file = self._catalog_file(language)
+            if os.path.exists(catalog_file):
+                try:
+                    with open(catalog_file, 'r', encoding='utf-8') as f:
+                        entry = json.load(f)
+                except Exception as e:
+                    print(f"Warning: Could not load Trusted Advisor check catalog {catalog_file}: {e}")
+            
+            self._languages[language] = entry
+            return entry
+    
+    def _persist_locked(self, entry: Dict[str, Any]):
+        catalog_file = self._catalog_file(entry['language'])
+        temp_file = f"{catalog_file}.{os.getpid()}.tmp"
+        
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, default=str)
+            # Atomic replace so concurrent workers never read a partial file
+            os.replace(temp_file, catalog_file)
+        except Exception as e:
+            print(f"Warning: Could not persist Trusted Advisor check catalog {catalog_file}: {e}")
+    
+    def _catalog_file(self, language: str) -> str:
+        safe_language = ''.join(c for c in language if c.isalnum() or c in '-_') or 'en'
+        return os.path.join(self.data_dir, f"checks_{safe_language}.json")
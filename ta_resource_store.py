@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Trusted Advisor Flagged Resource Store for TorWAR
+Author: Mohamed Toraif
+
+Compact per-check storage of Trusted Advisor flagged resources. The check's
+metadata schema is held once and every resource is a plain tuple, instead of
+the raw flaggedResources dicts plus a formatted dict per row that repeats
+every metadata field name.
+
+Features:
+- Metadata column names stored once per check
+- One tuple per resource with metadata values as a nested tuple
+- Optional interning of the highly repetitive region and status strings
+- Filtering and paging without materializing dicts for unused rows
+- Delta between two results of a check (new, changed and resolved resources)
+
+Author: Mohamed Toraif
+License: MIT
+"""
+
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Row layout: (resource ID, status, region, is suppressed, metadata values)
+RESOURCE_ID, STATUS, REGION, IS_SUPPRESSED, METADATA = range(5)
+
+
+class FlaggedResourceTable:
+    """Flagged resources of one Trusted Advisor check in a columnar-schema layout."""
+    
+    __slots__ = ('check_id', 'status', 'timestamp', 'resources_summary', 'columns', 'rows', 'delta')
+    
+    def __init__(self, check_id: str, columns: Sequence[str], rows: List[tuple],
+                 status: str = 'unknown', timestamp: str = '', resources_summary: Optional[Dict[str, Any]] = None):
+        self.check_id = check_id
+        self.columns = tuple(columns)
+        self.rows = rows
+        self.status = status
+        self.timestamp = timestamp
+        self.resources_summary = resources_summary or {}
+        self.delta = None
+    
+    @classmethod
+    def from_result(cls, result: Dict[str, Any], columns: Iterable[Any], intern_strings: bool = True):
+        """
+        Build a table from a DescribeTrustedAdvisorCheckResult 'result'.
+        
+        Args:
+            result: Check result containing flaggedResources
+            columns: Check metadata column names (strings or {'name': ...} dicts)
+            intern_strings: Intern region and status values shared by many rows
+        """
+        column_names = tuple(column['name'] if isinstance(column, dict) else column for column in columns)
+        intern = sys.intern if intern_strings else _identity
+        
+        rows = []
+        for resource in result.get('flaggedResources', []):
+            rows.append((
+                resource.get('resourceId', 'N/A'),
+                intern(resource.get('status') or 'unknown'),
+                intern(resource.get('region') or 'N/A'),
+                bool(resource.get('isSuppressed', False)),
+                tuple(resource.get('metadata') or ())
+            ))
+        
+        return cls(
+            result.get('checkId', ''),
+            column_names,
+            rows,
+            status=result.get('status', 'unknown'),
+            timestamp=result.get('timestamp', ''),
+            resources_summary=result.get('resourcesSummary', {})
+        )
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def regions(self) -> List[str]:
+        """Return the distinct regions of the flagged resources."""
+        return sorted({row[REGION] for row in self.rows if row[REGION] != 'N/A'})
+    
+    def statuses(self) -> List[str]:
+        """Return the distinct statuses of the flagged resources."""
+        return sorted({row[STATUS] for row in self.rows})
+    
+    def diff(self, previous: 'FlaggedResourceTable') -> 'ResourceDelta':
+        """Compute and attach the delta from an earlier result of the same check."""
+        self.delta = ResourceDelta.between(previous, self)
+        return self.delta
+    
+    def change_of(self, row: tuple) -> Optional[str]:
+        """Return 'new' or 'changed' if the row moved since the previous result."""
+        if self.delta is None:
+            return None
+        if row[RESOURCE_ID] in self.delta.new_ids:
+            return 'new'
+        if row[RESOURCE_ID] in self.delta.changed_ids:
+            return 'changed'
+        return None
+    
+    def filter(self, status: Optional[str] = None, region: Optional[str] = None,
+               search: Optional[str] = None, change: Optional[str] = None) -> List[tuple]:
+        """Return the rows matching every given filter; search is case-insensitive."""
+        rows = self.rows
+        if change:
+            rows = [row for row in rows if self.change_of(row) == change]
+        if status:
+            rows = [row for row in rows if row[STATUS] == status]
+        if region:
+            rows = [row for row in rows if row[REGION] == region]
+        if search:
+            needle = search.lower()
+            rows = [
+                row for row in rows
+                if needle in row[RESOURCE_ID].lower()
+                or any(needle in str(value).lower() for value in row[METADATA] if value)
+            ]
+        return rows
+    
+    def format_row(self, row: tuple) -> Dict[str, Any]:
+        """Format a row like format_trusted_advisor_resource formats a raw resource."""
+        metadata = {}
+        values = row[METADATA]
+        if self.columns and len(values) >= len(self.columns):
+            metadata = dict(zip(self.columns, values))
+        
+        formatted = {
+            'id': row[RESOURCE_ID],
+            'status': row[STATUS],
+            'region': row[REGION],
+            'metadata': metadata
+        }
+        if self.delta is not None:
+            formatted['change'] = self.change_of(row)
+        return formatted
+    
+    def page(self, rows: Sequence[tuple], page: int, page_size: int) -> Tuple[List[Dict[str, Any]], int, int]:
+        """
+        Format one page of rows.
+        
+        Returns:
+            (formatted resources, clamped page number, total pages)
+        """
+        total_pages = max(1, (len(rows) + page_size - 1) // page_size)
+        page = max(1, min(page, total_pages))
+        start = (page - 1) * page_size
+        return [self.format_row(row) for row in rows[start:start + page_size]], page, total_pages
+
+
+class ResourceDelta:
+    """Flagged resources that appeared, changed or were resolved between two results."""
+    
+    __slots__ = ('since', 'new_ids', 'changed_ids', 'resolved')
+    
+    def __init__(self, since: str, new_ids: frozenset, changed_ids: frozenset, resolved: List[tuple]):
+        self.since = since
+        self.new_ids = new_ids
+        self.changed_ids = changed_ids
+        self.resolved = resolved
+    
+    @classmethod
+    def between(cls, previous: FlaggedResourceTable, current: FlaggedResourceTable) -> 'ResourceDelta':
+        """Compare two results of one check by resource ID."""
+        previous_rows = {row[RESOURCE_ID]: row for row in previous.rows}
+        current_ids = set()
+        new_ids = set()
+        changed_ids = set()
+        
+        for row in current.rows:
+            resource_id = row[RESOURCE_ID]
+            current_ids.add(resource_id)
+            old_row = previous_rows.get(resource_id)
+            if old_row is None:
+                new_ids.add(resource_id)
+            elif old_row != row:
+                changed_ids.add(resource_id)
+        
+        resolved = [row for resource_id, row in previous_rows.items() if resource_id not in current_ids]
+        return cls(previous.timestamp, frozenset(new_ids), frozenset(changed_ids), resolved)
+    
+    def summary(self) -> Dict[str, Any]:
+        """Return delta counts for display."""
+        return {
+            'since': self.since,
+            'new': len(self.new_ids),
+            'changed': len(self.changed_ids),
+            'resolved': len(self.resolved)
+        }
+
+
+def _identity(value):
+    return value
@@ -6,33 +6,413 @@ Description: AWS Trusted Advisor recommendations integration for TorWAR
 
 import boto3
 import json
+import os
+import threading
+import time
 from datetime import datetime, timezone
 from botocore.exceptions import ClientError, NoCredentialsError
-from aws_helper import get_aws_session
+from flask import session
+from aws_helper import get_aws_client
+from wa_cache import TTLCache
+from ta_resource_store import FlaggedResourceTable
+from ta_check_catalog import TrustedAdvisorCheckCatalog
+
+# Check IDs per DescribeTrustedAdvisorCheckSummaries call
+SUMMARY_BATCH_SIZE = int(os.environ.get('TA_SUMMARY_BATCH_SIZE', '50'))
+# Check statuses whose flagged resources are worth fetching
+FLAGGED_STATUSES = ('error', 'warning')
+# Seconds a snapshot is served without revalidation
+SNAPSHOT_MAX_AGE = int(os.environ.get('TA_SNAPSHOT_MAX_AGE', '300'))
+# Seconds a stale snapshot may still be served while it is refreshed in the background
+SNAPSHOT_MAX_STALE = int(os.environ.get('TA_SNAPSHOT_MAX_STALE', '3600'))
+# Re-fetch flagged resources only for checks whose result timestamp changed
+INCREMENTAL_REFRESH = os.environ.get('TA_INCREMENTAL_REFRESH', 'true').lower() == 'true'
+# Checks whose flagged resources are kept in memory for paging
+RESOURCE_CACHE_SIZE = int(os.environ.get('TA_RESOURCE_CACHE_SIZE', '32'))
+# Seconds between refresh-status polls of the refresh scheduler
+REFRESH_POLL_SECONDS = float(os.environ.get('TA_REFRESH_POLL_SECONDS', '5'))
+# Refresh states that still need polling
+ACTIVE_REFRESH_STATES = ('queued', 'waiting', 'enqueued', 'processing', 'none')
+# Seconds after which a requested refresh that never completes is given up
+REFRESH_TIMEOUT_SECONDS = 900
+# Flagged resources per page of the resources endpoint
+RESOURCE_PAGE_SIZE = 25
+MAX_RESOURCE_PAGE_SIZE = 200
+
+
+class _Crawl:
+    """One in-flight crawl that concurrent callers can wait on."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class TrustedAdvisorCache:
+    """
+    Per-account stale-while-revalidate cache of Trusted Advisor snapshots.
+    
+    Fresh snapshots are served as-is; stale ones are served immediately while a
+    single background crawl refreshes them. Concurrent callers for the same
+    account share one crawl instead of starting their own.
+    """
+    
+    def __init__(self, max_age=SNAPSHOT_MAX_AGE, max_stale=SNAPSHOT_MAX_STALE):
+        self.max_age = max_age
+        self.max_stale = max_stale
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._crawls = {}
+    
+    def get(self, account_key, loader, force_refresh=False):
+        """
+        Return (data, age_seconds) for an account.
+        
+        Args:
+            account_key: Key identifying the AWS account
+            loader: Callable taking the previous snapshot data (or None) and
+                returning fresh crawl data
+            force_refresh: Ignore any cached snapshot and wait for a new crawl
+        """
+        if not force_refresh:
+            with self._lock:
+                snapshot = self._snapshots.get(account_key)
+            
+            if snapshot:
+                age = time.time() - snapshot['fetched_at']
+                if age < self.max_age:
+                    return snapshot['data'], age
+                if age < self.max_stale:
+                    self._start_background_crawl(account_key, loader)
+                    return snapshot['data'], age
+        
+        return self._crawl(account_key, loader), 0
+    
+    def mark_stale(self, account_key):
+        """Force the next read of an account's snapshot to revalidate it."""
+        with self._lock:
+            snapshot = self._snapshots.get(account_key)
+            if snapshot:
+                snapshot['fetched_at'] = min(snapshot['fetched_at'], time.time() - self.max_age)
+    
+    def peek(self, account_key):
+        """Return an account's snapshot data regardless of age, or None."""
+        with self._lock:
+            snapshot = self._snapshots.get(account_key)
+            return snapshot['data'] if snapshot else None
+    
+    def update_check(self, account_key, check_id, fields):
+        """
+        Replace one check's fields in an account's snapshot, e.g. after a refresh.
+        
+        The snapshot is copied rather than modified so requests rendering the
+        current one are not affected. Its age is left unchanged.
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(account_key)
+            if not snapshot:
+                return
+            
+            data = snapshot['data']
+            updated = None
+            recommendations = []
+            for rec in data.get('recommendations', []):
+                if rec['id'] == check_id:
+                    rec = updated = dict(rec, **fields)
+                recommendations.append(rec)
+            if updated is None:
+                return
+            
+            categories = {
+                category: [updated if rec['id'] == check_id else rec for rec in recs]
+                for category, recs in data.get('categories', {}).items()
+            }
+            snapshot['data'] = dict(data, recommendations=recommendations, categories=categories)
+    
+    def clear(self):
+        """Drop all snapshots."""
+        with self._lock:
+            self._snapshots.clear()
+    
+    def _crawl(self, account_key, loader):
+        with self._lock:
+            crawl = self._crawls.get(account_key)
+            owner = crawl is None
+            if owner:
+                crawl = _Crawl()
+                self._crawls[account_key] = crawl
+        
+        if owner:
+            return self._run(account_key, crawl, loader)
+        
+        crawl.done.wait()
+        return crawl.result
+    
+    def _start_background_crawl(self, account_key, loader):
+        with self._lock:
+            if account_key in self._crawls:
+                return
+            crawl = _Crawl()
+            self._crawls[account_key] = crawl
+        
+        thread = threading.Thread(target=self._run, args=(account_key, crawl, loader), daemon=True)
+        thread.start()
+    
+    def _run(self, account_key, crawl, loader):
+        with self._lock:
+            previous = self._snapshots.get(account_key)
+        
+        data = None
+        try:
+            data = loader(previous['data'] if previous else None)
+        except Exception as e:
+            print(f"Error refreshing Trusted Advisor snapshot: {e}")
+            data = {'error': f'Error retrieving recommendations: {str(e)}', 'recommendations': []}
+        finally:
+            with self._lock:
+                # Failed crawls keep serving the previous snapshot
+                if data is not None and 'error' not in data:
+                    self._snapshots[account_key] = {'data': data, 'fetched_at': time.time()}
+                self._crawls.pop(account_key, None)
+            crawl.result = data
+            crawl.done.set()
+        return data
+
+
+class TrustedAdvisorRefreshScheduler:
+    """
+    In-process queue of Trusted Advisor check refreshes.
+    
+    Requests are queued and a background thread polls
+    DescribeTrustedAdvisorCheckRefreshStatuses in batches. A refresh is only
+    requested once the check's refresh interval has passed, and when it
+    completes only that check's cached result is updated.
+    """
+    
+    def __init__(self, poll_seconds=REFRESH_POLL_SECONDS, retention=SNAPSHOT_MAX_STALE):
+        self.poll_seconds = poll_seconds
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._states = {}
+        self._thread = None
+    
+    def request(self, account_key, client, check_id):
+        """Queue a refresh of a check and return its current refresh state."""
+        now = time.time()
+        with self._lock:
+            self._clients[account_key] = client
+            state = self._states.get((account_key, check_id))
+            if state is None or state['state'] not in ACTIVE_REFRESH_STATES:
+                state = {
+                    'check_id': check_id,
+                    'state': 'queued',
+                    'requested_at': now,
+                    'updated_at': now,
+                    'not_before': 0,
+                    'message': ''
+                }
+                self._states[(account_key, check_id)] = state
+            
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            return self._public(state)
+    
+    def status(self, account_key, check_ids=None):
+        """Return refresh states of an account's checks, optionally limited to check_ids."""
+        with self._lock:
+            return {
+                check_id: self._public(state)
+                for (key, check_id), state in self._states.items()
+                if key == account_key and (check_ids is None or check_id in check_ids)
+            }
+    
+    def _run(self):
+        while True:
+            now = time.time()
+            with self._lock:
+                self._prune_locked()
+                active = {}
+                pending = False
+                for (account_key, check_id), state in self._states.items():
+                    if state['state'] not in ACTIVE_REFRESH_STATES:
+                        continue
+                    # Every active state times out, including ones AWS never reports on
+                    started_at = max(state.get('started_at', state['requested_at']), state['not_before'])
+                    if now - started_at > REFRESH_TIMEOUT_SECONDS:
+                        state.update(state='abandoned', message='Refresh did not complete in time', updated_at=now)
+                        continue
+                    pending = True
+                    # Checks still inside their refresh interval are not polled
+                    if state['not_before'] <= now:
+                        active.setdefault(account_key, []).append(check_id)
+                if not pending:
+                    self._thread = None
+                    return
+            
+            for account_key, check_ids in active.items():
+                try:
+                    self._poll_account(account_key, check_ids)
+                except Exception as e:
+                    print(f"Error polling Trusted Advisor refresh statuses: {e}")
+            
+            time.sleep(self.poll_seconds)
+    
+    def _poll_account(self, account_key, check_ids):
+        client = self._clients[account_key]
+        statuses = {}
+        for start in range(0, len(check_ids), SUMMARY_BATCH_SIZE):
+            batch = check_ids[start:start + SUMMARY_BATCH_SIZE]
+            try:
+                response = client.describe_trusted_advisor_check_refresh_statuses(checkIds=batch)
+            except ClientError as e:
+                if len(batch) == 1:
+                    self._fail(account_key, batch[0], e)
+                    continue
+                # One bad check ID fails the whole batch; find it one check at a time
+                for check_id in batch:
+                    try:
+                        response = client.describe_trusted_advisor_check_refresh_statuses(checkIds=[check_id])
+                    except ClientError as e:
+                        self._fail(account_key, check_id, e)
+                        continue
+                    for status in response.get('statuses', []):
+                        statuses[status['checkId']] = status
+                continue
+            for status in response.get('statuses', []):
+                statuses[status['checkId']] = status
+        
+        now = time.time()
+        for check_id in check_ids:
+            with self._lock:
+                state = self._states.get((account_key, check_id))
+            status = statuses.get(check_id)
+            if state is None or status is None:
+                continue
+            
+            refresh_status = status.get('status', 'none')
+            wait_seconds = status.get('millisUntilNextRefreshIsAllowed', 0) / 1000.0
+            
+            if state['state'] in ('queued', 'waiting'):
+                if refresh_status in ('enqueued', 'processing'):
+                    # Someone else already asked for this refresh; follow it, timing out from now
+                    self._set_state(state, refresh_status, started_at=now)
+                elif wait_seconds > 0:
+                    self._set_state(state, 'waiting', f"Next refresh allowed in {int(wait_seconds)}s",
+                                    not_before=now + wait_seconds)
+                else:
+                    self._start_refresh(account_key, client, state)
+            elif refresh_status == 'success':
+                self._complete(account_key, client, state)
+            elif refresh_status == 'abandoned':
+                self._set_state(state, 'abandoned', 'Trusted Advisor abandoned the refresh')
+            else:
+                self._set_state(state, refresh_status)
+    
+    def _start_refresh(self, account_key, client, state):
+        try:
+            response = client.refresh_trusted_advisor_check(checkId=state['check_id'])
+        except ClientError as e:
+            self._set_state(state, 'error', e.response['Error'].get('Message', str(e)))
+            return
+        
+        with self._lock:
+            state['started_at'] = time.time()
+        refresh_status = response.get('status', {}).get('status', 'enqueued')
+        if refresh_status == 'success':
+            self._complete(account_key, client, state)
+        else:
+            self._set_state(state, refresh_status)
+    
+    def _complete(self, account_key, client, state):
+        check_id = state['check_id']
+        recommendation = get_cached_check_recommendation(account_key, check_id) or {}
+        table = refresh_resource_table(client, account_key, check_id, recommendation.get('metadata') or [])
+        if table is None:
+            self._set_state(state, 'error', 'Refreshed, but the new result could not be retrieved')
+            return
+        
+        resource_count = table.resources_summary.get('resourcesFlagged', len(table))
+        trusted_advisor_cache.update_check(account_key, check_id, {
+            'status': table.status,
+            'timestamp': table.timestamp,
+            'resources_summary': table.resources_summary,
+            'resource_count': resource_count,
+            'has_flagged_resources': needs_flagged_resources({'status': table.status, 'hasFlaggedResources': len(table) > 0}),
+            'severity': get_severity_from_status(table.status),
+            'changed': recommendation.get('timestamp') != table.timestamp,
+            'resource_count_delta': resource_count - recommendation.get('resource_count', resource_count)
+        })
+        state['timestamp'] = table.timestamp
+        self._set_state(state, 'success')
+    
+    def _fail(self, account_key, check_id, error):
+        with self._lock:
+            state = self._states.get((account_key, check_id))
+        if state is not None:
+            self._set_state(state, 'error', error.response['Error'].get('Message', str(error)))
+    
+    def _set_state(self, state, value, message='', **fields):
+        with self._lock:
+            state.update(fields)
+            state['state'] = value
+            state['message'] = message
+            state['updated_at'] = time.time()
+    
+    def _prune_locked(self):
+        cutoff = time.time() - self.retention
+        for key in [key for key, state in self._states.items()
+                    if state['state'] not in ACTIVE_REFRESH_STATES and state['updated_at'] < cutoff]:
+            del self._states[key]
+    
+    @staticmethod
+    def _public(state):
+        return {key: value for key, value in state.items() if key not in ('not_before', 'started_at')}
+
+
+# Global snapshot cache and refresh scheduler shared by all requests in this process
+trusted_advisor_cache = TrustedAdvisorCache()
+refresh_scheduler = TrustedAdvisorRefreshScheduler()
+# Check definitions are the same for every account, so they are shared on disk
+check_catalog = TrustedAdvisorCheckCatalog(os.path.join(os.path.dirname(__file__), 'data', 'ta_checks'))
+# (account, check ID) -> FlaggedResourceTable; filled on demand when resources are paged.
+# In incremental mode tables are revalidated by check timestamp, so they can live longer.
+flagged_resource_cache = TTLCache(
+    max_size=RESOURCE_CACHE_SIZE,
+    ttl=SNAPSHOT_MAX_STALE if INCREMENTAL_REFRESH else SNAPSHOT_MAX_AGE
+)
 
 def get_trusted_advisor_client():
     """Get AWS Support client for Trusted Advisor."""
     try:
-        session = get_aws_session()
-        if not session:
-            return None
-        
         # Trusted Advisor requires Support API which is only available in us-east-1
-        support_client = session.client('support', region_name='us-east-1')
-        return support_client
+        return get_aws_client('support', region='us-east-1')
     except Exception as e:
         print(f"Error creating Trusted Advisor client: {e}")
         return None
 
-def get_trusted_advisor_checks():
-    """Get all available Trusted Advisor checks."""
+def get_trusted_advisor_checks(client=None, language='en'):
+    """
+    Get all available Trusted Advisor checks.
+    
+    Served from the persisted check catalog, which is revalidated against
+    DescribeTrustedAdvisorChecks once it is older than a day.
+    """
+    checks = check_catalog.get(language)
+    if checks is not None:
+        return checks
+    
     try:
-        client = get_trusted_advisor_client()
+        client = client or get_trusted_advisor_client()
         if not client:
             return None
         
-        response = client.describe_trusted_advisor_checks(language='en')
-        return response.get('checks', [])
+        response = client.describe_trusted_advisor_checks(language=language)
+        checks = response.get('checks', [])
+        if checks:
+            check_catalog.store(language, checks)
+        return checks
     except ClientError as e:
         error_code = e.response['Error']['Code']
         if error_code == 'SubscriptionRequiredError':
@@ -40,15 +420,16 @@ def get_trusted_advisor_checks():
             return None
         else:
             print(f"Error getting Trusted Advisor checks: {e}")
-            return None
+            # An outdated catalog is better than none while AWS is unavailable
+            return check_catalog.get(language, allow_stale=True)
     except Exception as e:
         print(f"Unexpected error getting Trusted Advisor checks: {e}")
-        return None
+        return check_catalog.get(language, allow_stale=True)
 
-def get_trusted_advisor_check_result(check_id):
+def get_trusted_advisor_check_result(check_id, client=None):
     """Get result for a specific Trusted Advisor check."""
     try:
-        client = get_trusted_advisor_client()
+        client = client or get_trusted_advisor_client()
         if not client:
             return None
         
@@ -61,16 +442,113 @@ def get_trusted_advisor_check_result(check_id):
         print(f"Error getting check result for {check_id}: {e}")
         return None
 
-def get_all_trusted_advisor_recommendations():
-    """Get all Trusted Advisor recommendations with their results."""
+def get_trusted_advisor_check_summaries(check_ids, client=None):
+    """
+    Get status summaries for many checks using batched summary calls.
+    
+    Returns a dict of check ID -> summary (status, timestamp, resourcesSummary,
+    hasFlaggedResources); checks in a failed batch are missing from the result.
+    """
+    client = client or get_trusted_advisor_client()
+    if not client:
+        return {}
+    
+    summaries = {}
+    for start in range(0, len(check_ids), SUMMARY_BATCH_SIZE):
+        batch = check_ids[start:start + SUMMARY_BATCH_SIZE]
+        try:
+            response = client.describe_trusted_advisor_check_summaries(checkIds=batch)
+            for summary in response.get('summaries', []):
+                summaries[summary['checkId']] = summary
+        except Exception as e:
+            print(f"Error getting check summaries for {len(batch)} checks: {e}")
+    
+    return summaries
+
+def needs_flagged_resources(summary):
+    """Return True if a check summary has flagged resources worth fetching."""
+    if not summary or summary.get('status', '').lower() not in FLAGGED_STATUSES:
+        return False
+    if 'hasFlaggedResources' in summary:
+        return bool(summary['hasFlaggedResources'])
+    return summary.get('resourcesSummary', {}).get('resourcesFlagged', 0) > 0
+
+def get_trusted_advisor_account_key():
+    """Return the cache key for the current session's AWS account."""
+    return session.get('aws_account_id') or session.get('aws_profile', 'default')
+
+def get_all_trusted_advisor_recommendations(force_refresh=False):
+    """
+    Get all Trusted Advisor recommendations from the account's cached snapshot.
+    
+    The snapshot is refreshed in the background once it is older than
+    SNAPSHOT_MAX_AGE. 'snapshot_age' holds its age in seconds. Flagged
+    resources are not included; page them with get_flagged_resources_page.
+    
+    Args:
+        force_refresh: Wait for a fresh crawl instead of using the snapshot
+    """
+    client = get_trusted_advisor_client()
+    if not client:
+        return {
+            'error': 'Unable to create Trusted Advisor client.',
+            'recommendations': []
+        }
+    
+    account_key = get_trusted_advisor_account_key()
+    data, age = trusted_advisor_cache.get(
+        account_key,
+        lambda previous: crawl_trusted_advisor_recommendations(client, previous, account_key),
+        force_refresh=force_refresh
+    )
+    if 'error' in data:
+        return data
+    
+    data = dict(data)
+    data['snapshot_age'] = int(age)
+    data['snapshot_age_text'] = format_snapshot_age(age)
+    return data
+
+def format_snapshot_age(age):
+    """Describe a snapshot age in seconds for display."""
+    if age < 60:
+        return 'just now'
+    if age < 3600:
+        return f"{int(age // 60)} min ago"
+    return f"{int(age // 3600)} h ago"
+
+def crawl_trusted_advisor_recommendations(client, previous=None, account_key=None):
+    """
+    Crawl all Trusted Advisor recommendations with their status summaries.
+    
+    Statuses and resource counts come from batched check summaries, so the
+    crawl costs one checks call plus one call per SUMMARY_BATCH_SIZE checks.
+    Checks whose timestamp or status differs from the previous snapshot are
+    marked 'changed'; in incremental mode their cached flagged resources are
+    re-fetched and diffed, and every other cached check is left alone.
+    
+    Args:
+        client: AWS Support client
+        previous: Previous snapshot data for the account, if any
+        account_key: Account key of flagged_resource_cache entries to refresh
+    """
     try:
-        checks = get_trusted_advisor_checks()
+        checks = get_trusted_advisor_checks(client)
         if not checks:
             return {
                 'error': 'Unable to retrieve Trusted Advisor checks. This may be due to insufficient support plan or permissions.',
                 'recommendations': []
             }
         
+        summaries = get_trusted_advisor_check_summaries([check['id'] for check in checks], client)
+        if not summaries:
+            # The catalog may come from disk, so this is the first call made for the account
+            return {
+                'error': 'Unable to retrieve Trusted Advisor check summaries. This may be due to insufficient support plan or permissions.',
+                'recommendations': []
+            }
+        previous_by_id = {rec['id']: rec for rec in (previous or {}).get('recommendations', [])}
+        
         recommendations = []
         categories = {
             'cost_optimizing': [],
@@ -86,14 +564,12 @@ def get_all_trusted_advisor_recommendations():
             check_description = check['description']
             check_category = check['category'].lower().replace(' ', '_')
             
-            # Get the result for this check
-            result = get_trusted_advisor_check_result(check_id)
+            result = summaries.get(check_id)
             
             if result:
                 status = result.get('status', 'unknown')
                 timestamp = result.get('timestamp', '')
                 resources_summary = result.get('resourcesSummary', {})
-                flagged_resources = result.get('flaggedResources', [])
                 
                 recommendation = {
                     'id': check_id,
@@ -103,11 +579,18 @@ def get_all_trusted_advisor_recommendations():
                     'status': status,
                     'timestamp': timestamp,
                     'resources_summary': resources_summary,
-                    'flagged_resources': flagged_resources,
+                    'metadata': check.get('metadata', []),
+                    'has_flagged_resources': needs_flagged_resources(result),
                     'severity': get_severity_from_status(status),
-                    'resource_count': len(flagged_resources)
+                    'resource_count': resources_summary.get('resourcesFlagged', 0)
                 }
                 
+                previous_rec = previous_by_id.get(check_id)
+                if previous_rec:
+                    recommendation['changed'] = (previous_rec.get('timestamp') != timestamp
+                                                 or previous_rec.get('status') != status)
+                    recommendation['resource_count_delta'] = recommendation['resource_count'] - previous_rec.get('resource_count', 0)
+                
                 recommendations.append(recommendation)
                 
                 # Categorize recommendations
@@ -116,13 +599,19 @@ def get_all_trusted_advisor_recommendations():
                 else:
                     categories.setdefault('other', []).append(recommendation)
         
+        changed = [rec for rec in recommendations if rec.get('changed')]
+        if INCREMENTAL_REFRESH and account_key and changed:
+            refresh_changed_resource_tables(client, account_key, changed)
+        
         return {
             'recommendations': recommendations,
             'categories': categories,
             'total_checks': len(recommendations),
+            'changed_checks': len(changed),
+            'previous_update': (previous or {}).get('last_updated'),
             'last_updated': datetime.now(timezone.utc).isoformat()
         }
-        
+    
     except Exception as e:
         print(f"Error getting Trusted Advisor recommendations: {e}")
         return {
@@ -193,9 +682,11 @@ def get_trusted_advisor_summary():
             'total_flagged_resources': total_flagged_resources,
             'last_updated': data.get('last_updated'),
             'high_priority_count': status_counts['error'],
-            'medium_priority_count': status_counts['warning']
+            'medium_priority_count': status_counts['warning'],
+            'snapshot_age': data.get('snapshot_age', 0),
+            'snapshot_age_text': data.get('snapshot_age_text')
         }
-        
+    
     except Exception as e:
         print(f"Error getting Trusted Advisor summary: {e}")
         return {
@@ -205,17 +696,31 @@ def get_trusted_advisor_summary():
         }
 
 def refresh_trusted_advisor_check(check_id):
-    """Refresh a specific Trusted Advisor check."""
+    """
+    Queue a refresh of a specific Trusted Advisor check.
+    
+    Returns:
+        The check's refresh state from the scheduler, or None on error
+    """
     try:
         client = get_trusted_advisor_client()
         if not client:
-            return False
+            return None
         
-        client.refresh_trusted_advisor_check(checkId=check_id)
-        return True
+        # Unknown IDs would fail every status batch they are polled in
+        checks = get_trusted_advisor_checks(client)
+        if checks is not None and check_id not in {check.get('id') for check in checks}:
+            print(f"Error refreshing check {check_id}: unknown Trusted Advisor check")
+            return None
+        
+        return refresh_scheduler.request(get_trusted_advisor_account_key(), client, check_id)
     except Exception as e:
         print(f"Error refreshing check {check_id}: {e}")
-        return False
+        return None
+
+def get_trusted_advisor_refresh_status(check_ids=None):
+    """Return the refresh states of the current account's checks."""
+    return refresh_scheduler.status(get_trusted_advisor_account_key(), check_ids)
 
 def get_trusted_advisor_check_categories():
     """Get available Trusted Advisor categories."""
@@ -262,13 +767,113 @@ def format_trusted_advisor_resource(resource, metadata):
             'metadata': {}
         }
         
-        # Map metadata to readable format
+        # Map metadata to readable format; check metadata is a list of column names
         if metadata and len(resource.get('metadata', [])) >= len(metadata):
             for i, field in enumerate(metadata):
                 if i < len(resource['metadata']):
-                    formatted['metadata'][field['name']] = resource['metadata'][i]
+                    name = field['name'] if isinstance(field, dict) else field
+                    formatted['metadata'][name] = resource['metadata'][i]
         
         return formatted
     except Exception as e:
         print(f"Error formatting resource: {e}")
         return resource
+
+def get_flagged_resources_page(check_id, page=1, page_size=RESOURCE_PAGE_SIZE, status=None, region=None, search=None,
+                               change=None):
+    """
+    Get one page of a check's flagged resources, formatted for display.
+    
+    The check result is fetched on first use and kept in flagged_resource_cache
+    as a compact FlaggedResourceTable, so paging and filtering do not call AWS
+    again.
+    
+    Args:
+        check_id: Trusted Advisor check ID
+        page: 1-based page number
+        page_size: Resources per page (capped at MAX_RESOURCE_PAGE_SIZE)
+        status: Only include resources with this status
+        region: Only include resources in this region
+        search: Case-insensitive text matched against resource ID and metadata
+        change: Only include resources that are 'new' or 'changed' since the previous result
+    
+    Returns:
+        Dict with the page of resources and paging/filter information, or
+        a dict with 'error' if the check result cannot be retrieved
+    """
+    account_key = get_trusted_advisor_account_key()
+    table = flagged_resource_cache.get((account_key, check_id))
+    recommendation = get_check_recommendation(check_id) or {}
+    
+    # A cached table stays valid until the check's result timestamp moves on
+    if table is None or (INCREMENTAL_REFRESH and table.timestamp != recommendation.get('timestamp', table.timestamp)):
+        table = refresh_resource_table(get_trusted_advisor_client(), account_key, check_id, recommendation.get('metadata') or [])
+        if table is None:
+            return {'error': f'Unable to retrieve results for check {check_id}'}
+    
+    rows = table.filter(status=status, region=region, search=search, change=change)
+    page_size = max(1, min(page_size, MAX_RESOURCE_PAGE_SIZE))
+    resources, page, total_pages = table.page(rows, page, page_size)
+    
+    return {
+        'check_id': check_id,
+        'page': page,
+        'page_size': page_size,
+        'total': len(rows),
+        'total_pages': total_pages,
+        'columns': list(table.columns),
+        'regions': table.regions(),
+        'statuses': table.statuses(),
+        'timestamp': table.timestamp,
+        'delta': table.delta.summary() if table.delta else None,
+        'resolved': [table.format_row(row) for row in table.delta.resolved[:page_size]] if table.delta else [],
+        'resources': resources
+    }
+
+def refresh_resource_table(client, account_key, check_id, metadata):
+    """
+    Fetch a check's full result into flagged_resource_cache.
+    
+    When an earlier table of the check is cached, the delta between the two
+    results is attached to the new table.
+    
+    Returns:
+        The new FlaggedResourceTable, or None if the result cannot be retrieved
+    """
+    result = get_trusted_advisor_check_result(check_id, client)
+    if not result:
+        return None
+    
+    table = FlaggedResourceTable.from_result(result, metadata)
+    previous = flagged_resource_cache.get((account_key, check_id))
+    if previous is not None and previous.timestamp != table.timestamp:
+        table.diff(previous)
+    elif previous is not None:
+        # Same result as before; keep the delta it was last compared with
+        table.delta = previous.delta
+    
+    flagged_resource_cache.set((account_key, check_id), table)
+    return table
+
+def refresh_changed_resource_tables(client, account_key, changed_recommendations):
+    """Re-fetch cached flagged resources of changed checks; uncached checks stay lazy."""
+    for recommendation in changed_recommendations:
+        cached = flagged_resource_cache.get((account_key, recommendation['id']))
+        if cached is not None and cached.timestamp != recommendation.get('timestamp'):
+            refresh_resource_table(client, account_key, recommendation['id'], recommendation.get('metadata') or [])
+
+def get_check_recommendation(check_id):
+    """Return a check's entry in the account snapshot, or None."""
+    data = get_all_trusted_advisor_recommendations()
+    for recommendation in data.get('recommendations', []):
+        if recommendation['id'] == check_id:
+            return recommendation
+    return None
+
+def get_cached_check_recommendation(account_key, check_id):
+    """Return a check's entry in an account's cached snapshot without crawling."""
+    data = trusted_advisor_cache.peek(account_key) or {}
+    for recommendation in data.get('recommendations', []):
+        if recommendation['id'] == check_id:
+            return recommendation
+    return None
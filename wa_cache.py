@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Well-Architected Caching Layer for TorWAR
+Author: Mohamed Toraif
+
+In-process caches for Well-Architected API data so that repeated page views
+do not re-issue the same paginated ListAnswers calls.
+
+Features:
+- Thread-safe TTL cache with size-bounded LRU eviction
+- Byte-bounded LRU cache for large immutable values
+- Answer summary cache keyed by (workload, lens, pillar)
+- Workload-level invalidation after answer updates
+- Ordered per-pillar question index for navigation
+- Lens version lookup cache per workload
+- Per-workload pillar statistics cache
+- Memoized lens associations per workload
+
+License: MIT
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+# Cache limits - override via environment
+ANSWER_CACHE_TTL = int(os.environ.get('WA_ANSWER_CACHE_TTL', '60'))
+ANSWER_CACHE_MAX_SIZE = int(os.environ.get('WA_ANSWER_CACHE_SIZE', '512'))
+QUESTION_INDEX_TTL = int(os.environ.get('WA_QUESTION_INDEX_TTL', '3600'))
+
+
+class TTLCache:
+    """Thread-safe key/value cache with per-entry expiry and LRU size bound."""
+    
+    def __init__(self, max_size: int = 256, ttl: float = 60):
+        """Initialize the cache with a maximum entry count and TTL in seconds."""
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return default
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entries when full."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, key: Hashable):
+        """Remove a single entry if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove every entry whose key matches predicate; returns the count removed."""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+    
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit/miss counters."""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+class ByteBoundedLRUCache:
+    """Thread-safe LRU cache bounded by the approximate byte size of its values."""
+    
+    def __init__(self, max_bytes: int):
+        """Initialize the cache with a total size budget in bytes."""
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def set(self, key: Hashable, value: Any, size: int):
+        """Store a value of the given size, evicting least recently used entries over budget."""
+        with self._lock:
+            if size > self.max_bytes:
+                # Would evict everything else and still not fit
+                return
+            
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+    
+    def invalidate(self, key: Hashable):
+        """Remove a single entry if present."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.current_bytes -= entry[1]
+    
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+class AnswerCache:
+    """Read-through cache of ListAnswers summaries keyed by (workload, lens, pillar)."""
+    
+    def __init__(self, max_size: int = ANSWER_CACHE_MAX_SIZE, ttl: float = ANSWER_CACHE_TTL):
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+    
+    def get(self, workload_id: str, lens_alias: str, pillar_id: str):
+        """Return cached answer summaries for a pillar, or None."""
+        answers = self._cache.get((workload_id, lens_alias, pillar_id))
+        # Hand out a copy so callers cannot reorder or extend the cached list
+        return list(answers) if answers is not None else None
+    
+    def set(self, workload_id: str, lens_alias: str, pillar_id: str, answers):
+        """Cache answer summaries for a pillar."""
+        self._cache.set((workload_id, lens_alias, pillar_id), list(answers))
+    
+    def invalidate_workload(self, workload_id: str):
+        """Drop every cached pillar for a workload after one of its answers changes."""
+        self._cache.invalidate_where(lambda key: key[0] == workload_id)
+    
+    def clear(self):
+        """Drop all cached answers."""
+        self._cache.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return cache statistics."""
+        return self._cache.stats()
+
+
+class QuestionIndex:
+    """Ordered question IDs of one pillar with constant-time position lookups."""
+    
+    def __init__(self, question_ids: Iterable[str]):
+        self.question_ids = tuple(question_ids)
+        self._positions = {question_id: i for i, question_id in enumerate(self.question_ids)}
+    
+    def __len__(self) -> int:
+        return len(self.question_ids)
+    
+    def __contains__(self, question_id: str) -> bool:
+        return question_id in self._positions
+    
+    def number(self, question_id: str) -> Optional[int]:
+        """Return the 1-based question number, or None if not in this pillar."""
+        position = self._positions.get(question_id)
+        return position + 1 if position is not None else None
+    
+    def previous(self, question_id: str) -> Optional[str]:
+        """Return the ID of the preceding question, or None at the start."""
+        position = self._positions.get(question_id)
+        if position is None or position == 0:
+            return None
+        return self.question_ids[position - 1]
+    
+    def next(self, question_id: str) -> Optional[str]:
+        """Return the ID of the following question, or None at the end."""
+        position = self._positions.get(question_id)
+        if position is None or position == len(self.question_ids) - 1:
+            return None
+        return self.question_ids[position + 1]
+
+
+class QuestionIndexCache:
+    """
+    Cache of QuestionIndex objects keyed by (workload, lens, pillar).
+    
+    Question order is fixed by the lens version, so entries are not affected by
+    answer updates and live much longer than cached answer summaries.
+    """
+    
+    def __init__(self, max_size: int = ANSWER_CACHE_MAX_SIZE, ttl: float = QUESTION_INDEX_TTL):
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+    
+    def get(self, workload_id: str, lens_alias: str, pillar_id: str) -> Optional[QuestionIndex]:
+        """Return the cached index for a pillar, or None."""
+        return self._cache.get((workload_id, lens_alias, pillar_id))
+    
+    def build(self, workload_id: str, lens_alias: str, pillar_id: str, answers) -> QuestionIndex:
+        """Build and cache an index from ListAnswers summaries in API order."""
+        index = QuestionIndex(answer['QuestionId'] for answer in answers)
+        self._cache.set((workload_id, lens_alias, pillar_id), index)
+        return index
+    
+    def invalidate_workload(self, workload_id: str):
+        """Drop every cached index for a workload, e.g. after a lens upgrade."""
+        self._cache.invalidate_where(lambda key: key[0] == workload_id)
+    
+    def clear(self):
+        """Drop all cached indexes."""
+        self._cache.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return cache statistics."""
+        return self._cache.stats()
+
+
+class LensAssociationRegistry:
+    """
+    Per-process record of lenses known to be associated with each workload.
+    
+    Lets callers skip AssociateLenses (a throttled write call) once a workload's
+    association has been seen, so it is attempted at most once per workload.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._associations = set()
+    
+    def record(self, workload_id: str, lens_aliases: Iterable[str]):
+        """Record lenses reported by GetWorkload/CreateWorkload or just associated."""
+        with self._lock:
+            self._associations.update((workload_id, lens_alias) for lens_alias in lens_aliases)
+    
+    def is_associated(self, workload_id: str, lens_alias: str) -> bool:
+        """Return True if the lens is known to be associated with the workload."""
+        with self._lock:
+            return (workload_id, lens_alias) in self._associations
+    
+    def forget(self, workload_id: str):
+        """Forget every recorded association for a workload."""
+        with self._lock:
+            self._associations = {key for key in self._associations if key[0] != workload_id}
+
+
+# Global caches shared by all requests in this process
+answer_cache = AnswerCache()
+question_index_cache = QuestionIndexCache()
+# (workload_id, lens_alias) -> lens version; only changes on a lens upgrade
+lens_version_cache = TTLCache(max_size=ANSWER_CACHE_MAX_SIZE, ttl=QUESTION_INDEX_TTL)
+# workload_id -> {pillar_id: statistics}; dropped with the answers on every write
+pillar_stats_cache = TTLCache(max_size=ANSWER_CACHE_MAX_SIZE, ttl=ANSWER_CACHE_TTL)
+lens_associations = LensAssociationRegistry()
+
+
+def invalidate_workload_answers(workload_id: str):
+    """Drop all answer-derived cache entries for a workload after an answer update."""
+    answer_cache.invalidate_workload(workload_id)
+    pillar_stats_cache.invalidate(workload_id)